@@ -0,0 +1,162 @@
+"""
+Drive the post and collection API through the ASGI application with
+concurrent clients over datasets of increasing size, and report requests per
+second, p50/p99 latency and queries per request for each endpoint.
+
+    python -m benchmarks.api_throughput --sizes 10000,100000,1000000 --output api.json
+
+Reports are JSON with sorted keys, so two runs can be compared with diff.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from .common import QueryCounter, auth_service_token, percentile, scratch_database, setup_django, write_report
+
+
+def seed(posts, collections):
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+
+    from content_collections.models import Collection
+    from posts.models import Post
+
+    started = time.perf_counter()
+    call_command(
+        'seed_content',
+        posts=posts,
+        collections=collections,
+        users=max(1, collections // 10),
+        prefix='bench',
+        verbosity=0
+    )
+    seed_seconds = time.perf_counter() - started
+
+    user = User.objects.order_by('id').first()
+    token = auth_service_token(user, int(time.time()) + 3600)
+    ids = Post.objects.order_by('id').values_list('id', flat=True)
+    context = {
+        'post_ids': (ids.first(), ids.last()),
+        'collection_ids': list(Collection.objects.filter(owner=user).values_list('id', flat=True)),
+    }
+    return token, context, seed_seconds
+
+
+def scenarios(context, rng):
+    """Request factories by name; each returns (method, path, json body)."""
+    low, high = context['post_ids']
+    collections = context['collection_ids']
+    return {
+        'post_list': lambda: ('GET', f'/api/posts/?page={rng.randint(1, 50)}', None),
+        'post_retrieve': lambda: ('GET', f'/api/posts/{rng.randint(low, high)}/', None),
+        'post_create': lambda: ('POST', '/api/posts/', {'title': 'Benchmark', 'body': 'Body ' * 40}),
+        'collection_list': lambda: ('GET', '/api/collections/', None),
+        'collection_retrieve': lambda: ('GET', f'/api/collections/{rng.choice(collections)}/', None),
+        'collection_posts': lambda: ('GET', f'/api/collections/{rng.choice(collections)}/posts/', None),
+        'collection_add_post': lambda: (
+            'POST',
+            f'/api/collections/{rng.choice(collections)}/add_post/',
+            {'post_ids': [rng.randint(low, high) for _ in range(5)]}
+        ),
+    }
+
+
+async def load(client, make_request, requests, concurrency, counter):
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def request():
+        nonlocal errors
+        method, path, body = make_request()
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    queries = counter.count
+    started = time.perf_counter()
+    await asyncio.gather(*(request() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': requests,
+        'errors': errors,
+        'requests_per_second': requests / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'queries_per_request': (counter.count - queries) / requests,
+    }
+
+
+def write_concurrency(concurrency):
+    from django.db import connection
+
+    # SQLite fails concurrent writers with "database is locked" instead of
+    # queueing them, so write endpoints are measured one request at a time.
+    return 1 if connection.vendor == 'sqlite' else concurrency
+
+
+async def run_size(token, context, requests, concurrency, counter, only):
+    import httpx
+
+    from content_platform.asgi import application
+
+    writes = write_concurrency(concurrency)
+    rng = random.Random(42)
+    results = {}
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=application),
+        base_url='http://testserver',
+        headers={'Authorization': f'Bearer {token}'}
+    ) as client:
+        for name, make_request in scenarios(context, rng).items():
+            if only and name not in only:
+                continue
+            is_write = make_request()[0] != 'GET'
+            results[name] = await load(
+                client, make_request, requests, writes if is_write else concurrency, counter
+            )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10000', help='Comma-separated post counts')
+    parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--only', help='Comma-separated scenario names to run')
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+
+    if not settings.AUTH_SERVICE_SECRET_KEY:
+        settings.AUTH_SERVICE_SECRET_KEY = 'benchmark-signing-key'
+    only = set(args.only.split(',')) if args.only else None
+
+    counter = QueryCounter()
+    counter.install()
+    results = {}
+    for size in (int(size) for size in args.sizes.split(',')):
+        with scratch_database():
+            token, context, seed_seconds = seed(size, collections=max(10, size // 100))
+            results[str(size)] = {
+                'seed_seconds': seed_seconds,
+                'endpoints': asyncio.run(run_size(
+                    token, context, args.requests, args.concurrency, counter, only
+                )),
+            }
+    results['config'] = {
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'write_concurrency': write_concurrency(args.concurrency),
+    }
+    write_report('api_throughput', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Load the sync DRF views and their async counterparts through the ASGI
+application with the same concurrency and compare throughput, latency and
+the number of threads the process needed.
+
+    python -m benchmarks.async_views --requests 2000 --concurrency 100 --output async.json
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+from .common import auth_service_token, percentile, scratch_database, setup_django, write_report
+
+ENDPOINTS = {
+    'post_list': ('/api/posts/', '/api/async/posts/'),
+    'post_detail': ('/api/posts/{post_id}/', '/api/async/posts/{post_id}/'),
+    'collection_detail': (
+        '/api/collections/{collection_id}/', '/api/async/collections/{collection_id}/'
+    ),
+}
+
+
+def seed(posts):
+    from django.contrib.auth.models import User
+
+    from content_collections.models import Collection
+    from posts.models import Post
+
+    user = User.objects.create_user(username='bench', email='bench@example.com')
+    created = Post.objects.bulk_create(
+        Post(title=f'Post {n}', body='Body ' * 50, author=user) for n in range(posts)
+    )
+    collection = Collection.objects.create(name='Bench', owner=user)
+    collection.posts.add(*created[:20])
+    token = auth_service_token(user, int(time.time()) + 3600)
+    return {'post_id': created[0].id, 'collection_id': collection.id}, token
+
+
+async def load(client, path, requests, concurrency):
+    latencies = []
+    peak_threads = threading.active_count()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def request():
+        nonlocal peak_threads
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+            peak_threads = max(peak_threads, threading.active_count())
+
+    started = time.perf_counter()
+    await asyncio.gather(*(request() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': requests,
+        'requests_per_second': requests / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'peak_threads': peak_threads,
+    }
+
+
+async def run(ids, token, requests, concurrency):
+    import httpx
+
+    from content_platform.asgi import application
+
+    results = {}
+    transport = httpx.ASGITransport(app=application)
+    async with httpx.AsyncClient(
+        transport=transport,
+        base_url='http://testserver',
+        headers={'Authorization': f'Bearer {token}'}
+    ) as client:
+        for name, (sync_path, async_path) in ENDPOINTS.items():
+            results[name] = {
+                'sync': await load(client, sync_path.format(**ids), requests, concurrency),
+                'async': await load(client, async_path.format(**ids), requests, concurrency),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=1000, help='Requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--posts', type=int, default=200)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+
+    if not settings.AUTH_SERVICE_SECRET_KEY:
+        settings.AUTH_SERVICE_SECRET_KEY = 'benchmark-signing-key'
+    settings.ALLOWED_HOSTS = ['*']
+
+    with scratch_database():
+        ids, token = seed(args.posts)
+        results = asyncio.run(run(ids, token, args.requests, args.concurrency))
+    results['config'] = {
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'posts': args.posts,
+    }
+    write_report('async_views', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+def setup_django():
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'content_platform.settings')
+    # Benchmarks drive the ASGI application.
+    os.environ.setdefault('DJANGO_SERVER_MODE', 'asgi')
+    import django
+    django.setup()
+
+
+@contextmanager
+def scratch_database(keep=False):
+    """
+    Run against a throwaway copy of the configured database (the same one
+    the test runner would create) so benchmarks never touch real data.
+    """
+    from django.db import connection
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keep)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keep)
+
+
+def auth_service_token(user, expires):
+    """
+    Link `user` to an auth_service subject and return a token for it, so
+    requests authenticate as the seeded user rather than a new one.
+    """
+    from django.conf import settings
+    from jose import jwt
+
+    from content_platform.models import AuthServiceAccount
+
+    subject = f'bench-{user.pk}'
+    AuthServiceAccount.objects.get_or_create(subject=subject, defaults={'user': user})
+    return jwt.encode(
+        {'sub': subject, 'exp': expires},
+        settings.AUTH_SERVICE_SECRET_KEY,
+        algorithm=settings.AUTH_SERVICE_ALGORITHM
+    )
+
+
+class QueryCounter:
+    """Counts queries on every connection, whichever thread opened it."""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def install(self):
+        from django.db import connection
+        from django.db.backends.signals import connection_created
+
+        connection.execute_wrappers.append(self)
+        connection_created.connect(self._connection_created, weak=False)
+
+    def _connection_created(self, sender, connection, **kwargs):
+        connection.execute_wrappers.append(self)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def write_report(name, results, output=None):
+    report = {
+        'benchmark': name,
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'results': results,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if output:
+        Path(output).write_text(text + '\n')
+    else:
+        print(text)
+    return report
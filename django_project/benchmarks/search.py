@@ -0,0 +1,78 @@
+"""
+Measure full-text search latency over a seeded posts table.
+
+    python -m benchmarks.search --posts 1000000 --output search.json
+"""
+import argparse
+import itertools
+import random
+import time
+
+from .common import percentile, scratch_database, setup_django, write_report
+
+WORDS = [
+    'django', 'python', 'channels', 'websocket', 'postgres', 'sqlite', 'cache',
+    'redis', 'kafka', 'spark', 'stream', 'event', 'latency', 'index', 'query',
+    'search', 'ranking', 'snippet', 'cursor', 'deploy', 'docker', 'compose',
+    'signal', 'serializer', 'viewset', 'router', 'collection', 'post', 'body',
+    'title', 'author', 'owner', 'token', 'session', 'migration', 'replica',
+]
+# Pad the vocabulary with a long Zipf-distributed tail so term frequencies
+# look like real text rather than every post matching every query.
+VOCABULARY = WORDS + [f'term{n}' for n in range(20000)]
+CUM_WEIGHTS = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(VOCABULARY))))
+QUERIES = ['django', 'websocket latency', 'redis cache', 'search ranking snippet', 'term500', 'term12000']
+
+
+def seed_posts(count, batch_size=10000):
+    from posts.models import Post
+
+    rng = random.Random(42)
+    for start in range(0, count, batch_size):
+        Post.objects.bulk_create([
+            Post(
+                title=' '.join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=4)),
+                body=' '.join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=rng.randint(20, 80))),
+            )
+            for _ in range(min(batch_size, count - start))
+        ])
+
+
+def run(posts, repeat):
+    from posts.search import search_posts
+
+    started = time.perf_counter()
+    seed_posts(posts)
+    seed_seconds = time.perf_counter() - started
+
+    results = {'posts': posts, 'seed_seconds': seed_seconds, 'queries': {}}
+    for query in QUERIES:
+        timings = []
+        cursor = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            rows, cursor = search_posts(query, cursor=cursor, limit=20)
+            timings.append((time.perf_counter() - started) * 1000)
+        results['queries'][query] = {
+            'p50_ms': percentile(timings, 50),
+            'p99_ms': percentile(timings, 99),
+            'max_ms': max(timings),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    setup_django()
+    with scratch_database():
+        results = run(args.posts, args.repeat)
+    write_report('search', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Compare the memory held per open notification connection for the
+Server-Sent Events endpoint against the websocket endpoint.
+
+    python -m benchmarks.sse_vs_websocket --connections 2000 --output sse.json
+"""
+import argparse
+import asyncio
+import gc
+import tracemalloc
+
+from .common import setup_django, write_report
+
+
+async def open_websockets(application, count):
+    from channels.testing import WebsocketCommunicator
+
+    communicators = []
+    for _ in range(count):
+        communicator = WebsocketCommunicator(application, '/ws/notifications/')
+        connected, _ = await communicator.connect()
+        assert connected
+        communicators.append(communicator)
+    return communicators
+
+
+async def open_streams(application, count):
+    from asgiref.testing import ApplicationCommunicator
+
+    communicators = []
+    for _ in range(count):
+        communicator = ApplicationCommunicator(application, {
+            'type': 'http',
+            'http_version': '1.1',
+            'method': 'GET',
+            'path': '/sse/notifications/',
+            'query_string': b'',
+            'headers': [],
+        })
+        await communicator.send_input({'type': 'http.request', 'body': b''})
+        await communicator.receive_output()
+        await communicator.receive_output()
+        communicators.append(communicator)
+    return communicators
+
+
+async def close_websockets(communicators):
+    for communicator in communicators:
+        await communicator.disconnect()
+
+
+async def close_streams(communicators):
+    for communicator in communicators:
+        await communicator.send_input({'type': 'http.disconnect'})
+        await communicator.wait()
+
+
+async def measure(opener, closer, application, count):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    communicators = await opener(application, count)
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    await closer(communicators)
+    return {
+        'connections': count,
+        'bytes_total': allocated,
+        'bytes_per_connection': allocated / count,
+    }
+
+
+async def run(connections):
+    from content_platform.asgi import application
+
+    return {
+        'websocket': await measure(open_websockets, close_websockets, application, connections),
+        'sse': await measure(open_streams, close_streams, application, connections),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    setup_django()
+    results = asyncio.run(run(args.connections))
+    write_report('sse_vs_websocket', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Simulate a reconnect storm against the notifications websocket and compare
+session-cookie authentication with auth_service bearer tokens: connects per
+second, connect latency and database queries, first with cold caches (right
+after a deploy) and then warm.
+
+    python -m benchmarks.ws_connect_storm --clients 5000 --users 500 --output storm.json
+"""
+import argparse
+import asyncio
+import time
+
+from .common import QueryCounter, auth_service_token, percentile, scratch_database, setup_django, write_report
+
+
+def create_clients(users):
+    from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+    from django.contrib.auth.models import User
+    from django.contrib.sessions.backends.db import SessionStore
+
+    clients = []
+    expires = int(time.time()) + 3600
+    for n in range(users):
+        user = User.objects.create_user(username=f'storm{n}', email=f'storm{n}@example.com')
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        token = auth_service_token(user, expires)
+        clients.append({'session': session.session_key, 'token': token})
+    return clients
+
+
+def communicator_for(application, mode, client):
+    from channels.testing import WebsocketCommunicator
+
+    if mode == 'session':
+        return WebsocketCommunicator(
+            application, '/ws/notifications/',
+            headers=[(b'cookie', f"sessionid={client['session']}".encode())]
+        )
+    return WebsocketCommunicator(
+        application, '/ws/notifications/', subprotocols=['bearer', client['token']]
+    )
+
+
+async def storm(application, mode, clients, count, concurrency, counter):
+    latencies = []
+    communicators = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def connect(client):
+        async with semaphore:
+            communicator = communicator_for(application, mode, client)
+            started = time.perf_counter()
+            connected, _ = await communicator.connect()
+            latencies.append(time.perf_counter() - started)
+            assert connected
+            communicators.append(communicator)
+
+    queries = counter.count
+    started = time.perf_counter()
+    await asyncio.gather(*(connect(clients[n % len(clients)]) for n in range(count)))
+    elapsed = time.perf_counter() - started
+    queries = counter.count - queries
+    for communicator in communicators:
+        await communicator.disconnect()
+    return {
+        'connects': count,
+        'seconds': elapsed,
+        'connects_per_second': count / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'queries': queries,
+        'queries_per_connect': queries / count,
+    }
+
+
+async def run(clients, count, concurrency, counter):
+    from django.conf import settings
+    from django.core.cache import caches
+
+    from content_platform.asgi import application
+    from content_platform.authentication import token_cache
+
+    results = {}
+    for mode in ('session', 'token'):
+        # A fresh deploy: nothing decoded or cached yet.
+        token_cache.clear()
+        caches[settings.AUTH_USER_CACHE].clear()
+        results[mode] = {
+            'cold': await storm(application, mode, clients, count, concurrency, counter),
+            'warm': await storm(application, mode, clients, count, concurrency, counter),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, default=2000, help='Connects per storm')
+    parser.add_argument('--users', type=int, default=200, help='Distinct users connecting')
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+
+    if not settings.AUTH_SERVICE_SECRET_KEY:
+        settings.AUTH_SERVICE_SECRET_KEY = 'benchmark-signing-key'
+
+    counter = QueryCounter()
+    with scratch_database():
+        counter.install()
+        clients = create_clients(args.users)
+        results = asyncio.run(run(clients, args.clients, args.concurrency, counter))
+    results['config'] = {
+        'clients': args.clients,
+        'users': args.users,
+        'concurrency': args.concurrency,
+    }
+    write_report('ws_connect_storm', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,295 @@
+"""
+Measure notification fan-out: open many websocket clients, make post and
+collection writes through the API, and time how long each resulting event
+takes to reach every client. Also reports memory per open socket and CPU
+time per broadcast.
+
+In process, with channels' WebsocketCommunicator against the ASGI app (CPU
+and memory are this process, clients included):
+
+    python -m benchmarks.ws_fanout --clients 1000,5000,10000 --output fanout.json
+
+Against a running server over real sockets (needs the `websockets` package
+and enough file descriptors, see `ulimit -n`). Pass the server's pid to
+sample its memory and CPU from /proc:
+
+    python -m benchmarks.ws_fanout --url http://localhost:8000 --token "$TOKEN" \\
+        --server-pid "$(pgrep -f daphne)" --clients 1000,5000
+
+With the in-memory channel layer only clients of the process that handled
+the write are notified, so run a single server process for this.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import time
+
+from .common import percentile, scratch_database, setup_django, write_report
+
+WS_PATH = '/ws/notifications/'
+
+
+def process_usage(pid):
+    """Resident memory (bytes) and CPU time (seconds) of a local process, or None."""
+    try:
+        with open(f'/proc/{pid}/stat') as stat:
+            fields = stat.read().rsplit(')', 1)[1].split()
+    except OSError:
+        return None
+    utime, stime, rss = int(fields[11]), int(fields[12]), int(fields[21])
+    return rss * os.sysconf('SC_PAGE_SIZE'), (utime + stime) / os.sysconf('SC_CLK_TCK')
+
+
+class CommunicatorClient:
+    def __init__(self, application, token):
+        from channels.testing import WebsocketCommunicator
+
+        self.communicator = WebsocketCommunicator(
+            application, WS_PATH, subprotocols=['bearer', token]
+        )
+
+    async def connect(self):
+        connected, _ = await self.communicator.connect()
+        assert connected
+
+    async def receive(self):
+        return json.loads(await self.communicator.receive_from(timeout=None))
+
+    async def close(self):
+        await self.communicator.disconnect()
+
+
+class SocketClient:
+    def __init__(self, url, token):
+        self.url = url.replace('http', 'ws', 1).rstrip('/') + WS_PATH
+        self.token = token
+        self.websocket = None
+
+    async def connect(self):
+        import websockets
+
+        self.websocket = await websockets.connect(
+            self.url, subprotocols=['bearer', self.token], max_queue=None
+        )
+
+    async def receive(self):
+        return json.loads(await self.websocket.recv())
+
+    async def close(self):
+        await self.websocket.close()
+
+
+async def open_clients(make_client, count, concurrency):
+    clients = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def connect():
+        async with semaphore:
+            client = make_client()
+            await client.connect()
+            clients.append(client)
+
+    await asyncio.gather(*(connect() for _ in range(count)))
+    return clients
+
+
+async def delivered(client, match, timeout):
+    """When `client` received the event picked out by `match`, or None."""
+    async def wait():
+        while True:
+            if match(await client.receive()):
+                return time.perf_counter()
+
+    try:
+        return await asyncio.wait_for(wait(), timeout)
+    except asyncio.TimeoutError:
+        return None
+
+
+async def broadcast(writer, clients, number, state, timeout):
+    """
+    Make one write, alternating between creating a post and adding the last
+    created post to the benchmark collection, and return when each client
+    saw its event (None for clients that did not within `timeout`).
+    """
+    if number % 2 == 0 or state.get('post_id') is None:
+        title = f'Fan-out {number}'
+        request = ('POST', '/api/posts/', {'title': title, 'body': 'Fan-out benchmark'})
+
+        def match(message):
+            return (message['event_type'] == 'post_created'
+                    and message['data'].get('title') == title)
+    else:
+        collection_id, post_id = state['collection_id'], state['post_id']
+        request = (
+            'POST', f'/api/collections/{collection_id}/add_post/', {'post_ids': [post_id]}
+        )
+
+        def match(message):
+            return (message['event_type'] == 'collection_posts_changed'
+                    and message['data'].get('collection_id') == collection_id
+                    and post_id in message['data'].get('added', []))
+
+    waiters = [asyncio.create_task(delivered(client, match, timeout)) for client in clients]
+    # Let every waiter start listening before the write goes out.
+    await asyncio.sleep(0)
+    method, path, body = request
+    started = time.perf_counter()
+    response = await writer.request(method, path, json=body)
+    response.raise_for_status()
+    if path == '/api/posts/':
+        state['post_id'] = response.json()['id']
+    arrivals = await asyncio.gather(*waiters)
+    return started, arrivals
+
+
+async def run_size(make_client, writer, count, state, pid, options):
+    gc.collect()
+    before = process_usage(pid)
+    started = time.perf_counter()
+    clients = await open_clients(make_client, count, options.connect_concurrency)
+    connect_seconds = time.perf_counter() - started
+    gc.collect()
+    connected = process_usage(pid)
+
+    latencies = []
+    completions = []
+    missed = 0
+    for number in range(options.broadcasts):
+        sent, arrivals = await broadcast(writer, clients, number, state, options.timeout)
+        received = [arrival - sent for arrival in arrivals if arrival is not None]
+        missed += len(arrivals) - len(received)
+        latencies.extend(received)
+        if received:
+            completions.append(max(received))
+    finished = process_usage(pid)
+
+    for client in clients:
+        await client.close()
+
+    result = {
+        'clients': count,
+        'connect_seconds': connect_seconds,
+        'broadcasts': options.broadcasts,
+        'deliveries': len(latencies),
+        'missed': missed,
+        'latency_ms': {
+            name: percentile(latencies, pct) * 1000 if latencies else None
+            for name, pct in (('p50', 50), ('p90', 90), ('p99', 99), ('max', 100))
+        },
+        'fanout_complete_ms': {
+            name: percentile(completions, pct) * 1000 if completions else None
+            for name, pct in (('p50', 50), ('p99', 99))
+        },
+        'bytes_per_socket': None,
+        'cpu_ms_per_broadcast': None,
+    }
+    if before and connected and finished:
+        # RSS rarely shrinks, so sizes should grow from run to run.
+        result['bytes_per_socket'] = (connected[0] - before[0]) / count
+        result['cpu_ms_per_broadcast'] = (finished[1] - connected[1]) / options.broadcasts * 1000
+    return result
+
+
+async def run(make_client, writer, sizes, pid, options):
+    response = await writer.post('/api/collections/', json={'name': 'Fan-out benchmark'})
+    response.raise_for_status()
+    # Creation only echoes the name; the list is newest first.
+    response = await writer.get('/api/collections/')
+    state = {'collection_id': response.json()['results'][0]['id']}
+    return {
+        str(count): await run_size(make_client, writer, count, state, pid, options)
+        for count in sizes
+    }
+
+
+def benchmark_in_process(sizes, options):
+    import httpx
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from jose import jwt
+
+    from content_platform.asgi import application
+
+    if not settings.AUTH_SERVICE_SECRET_KEY:
+        settings.AUTH_SERVICE_SECRET_KEY = 'benchmark-signing-key'
+
+    with scratch_database():
+        user = User.objects.create_user(username='fanout', email='fanout@example.com')
+        token = jwt.encode(
+            {'sub': user.email, 'exp': int(time.time()) + 3600},
+            settings.AUTH_SERVICE_SECRET_KEY,
+            algorithm=settings.AUTH_SERVICE_ALGORITHM
+        )
+
+        async def main():
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=application),
+                base_url='http://testserver',
+                headers={'Authorization': f'Bearer {token}'}
+            ) as writer:
+                return await run(
+                    lambda: CommunicatorClient(application, token),
+                    writer, sizes, os.getpid(), options
+                )
+
+        return asyncio.run(main())
+
+
+def benchmark_server(sizes, options):
+    import httpx
+
+    async def main():
+        async with httpx.AsyncClient(
+            base_url=options.url,
+            headers={'Authorization': f'Bearer {options.token}'},
+            timeout=options.timeout
+        ) as writer:
+            return await run(
+                lambda: SocketClient(options.url, options.token),
+                writer, sizes, options.server_pid, options
+            )
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', default='1000', help='Comma-separated client counts')
+    parser.add_argument('--broadcasts', type=int, default=20, help='Writes per client count')
+    parser.add_argument('--connect-concurrency', type=int, default=200)
+    parser.add_argument('--timeout', type=float, default=30, help='Seconds to wait for a delivery')
+    parser.add_argument('--url', help='Base URL of a running server; in process when omitted')
+    parser.add_argument('--token', help='Auth service token for --url')
+    parser.add_argument('--server-pid', type=int, help='Server process to sample with --url')
+    parser.add_argument('--output')
+    options = parser.parse_args()
+    sizes = sorted(int(count) for count in options.clients.split(','))
+
+    setup_django()
+    if options.url:
+        if not options.token:
+            parser.error('--url needs --token')
+        try:
+            import websockets  # noqa: F401
+        except ImportError:
+            parser.error('--url needs the websockets package')
+        results = benchmark_server(sizes, options)
+    else:
+        results = benchmark_in_process(sizes, options)
+
+    from django.conf import settings
+
+    results['config'] = {
+        'mode': 'server' if options.url else 'in_process',
+        'broadcasts': options.broadcasts,
+        'coalesce_window': settings.NOTIFICATION_COALESCE_WINDOW,
+        'channel_layer': settings.CHANNEL_LAYERS['default']['BACKEND'],
+    }
+    write_report('ws_fanout', results, options.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,17 @@
 from django.apps import AppConfig
+from django.db.models.signals import m2m_changed, pre_delete
 
 class ContentCollectionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'content_collections' 
\ No newline at end of file
+    name = 'content_collections'
+
+    def ready(self):
+        from posts.models import ArchivedPost, Post
+        from . import counters, ordering
+        from .models import Collection
+
+        m2m_changed.connect(counters.membership_changed, sender=Collection.posts.through)
+        m2m_changed.connect(ordering.assign_missing_ranks, sender=Collection.posts.through)
+        pre_delete.connect(counters.collection_deleting, sender=Collection)
+        pre_delete.connect(counters.archived_post_deleting, sender=ArchivedPost)
+        pre_delete.connect(counters.post_deleting, sender=Post)
@@ -0,0 +1,117 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Prefetch
+from django.http import JsonResponse
+
+from content_platform.async_api import APIError, async_api_view, json_body
+from posts.async_views import page_links, requested_page
+from posts.broadcast import broadcaster
+from posts.versioning import bump_version
+
+from .lookups import attach_archived_posts, preview_memberships
+from .membership import add_posts, remove_posts, requested_post_ids, resolve_posts
+from .models import Collection, CollectionPost
+from .serializers import CollectionCreateSerializer, CollectionListSerializer, CollectionSerializer
+
+
+async def notify(event_type, data):
+    """Compact delta stamped with the collection version, as in the sync views."""
+    collection_id = data.get('id', data.get('collection_id'))
+    data['version'] = await sync_to_async(bump_version)('collection', collection_id)
+    await broadcaster.apublish(event_type, data)
+
+
+async def get_collection(user, pk, queryset=None):
+    queryset = queryset if queryset is not None else Collection.objects.all()
+    try:
+        return await queryset.select_related('owner').aget(pk=pk, owner=user)
+    except Collection.DoesNotExist:
+        raise APIError(404, {'detail': 'Not found.'})
+
+
+async def requested_posts(request):
+    post_ids = requested_post_ids(json_body(request))
+    if post_ids is None:
+        raise APIError(400, {'error': 'post_id or post_ids must be post ids'})
+    found, not_found = await sync_to_async(resolve_posts)(post_ids)
+    if not found:
+        raise APIError(404, {'error': 'Post not found', 'not_found': not_found})
+    return found, not_found
+
+
+@async_api_view(['GET', 'POST'], login_required=True)
+async def collection_list(request, user):
+    if request.method == 'POST':
+        serializer = CollectionCreateSerializer(data=json_body(request))
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=400)
+        collection = await Collection.objects.acreate(owner=user, **serializer.validated_data)
+        await notify('collection_created', {
+            'id': collection.id,
+            'name': collection.name,
+            'owner': user.username
+        })
+        return JsonResponse(CollectionCreateSerializer(collection).data, status=201)
+
+    page = requested_page(request)
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    preview_size = getattr(settings, 'COLLECTION_PREVIEW_POSTS', 3)
+    queryset = Collection.objects.filter(owner=user)
+    count = await queryset.acount()
+    offset = (page - 1) * page_size
+    if offset and offset >= count:
+        raise APIError(404, {'detail': 'Invalid page.'})
+    collections = [
+        collection async for collection in queryset.select_related('owner').prefetch_related(
+            preview_memberships(preview_size)
+        ).order_by('-created_at', '-id')[offset:offset + page_size]
+    ]
+    next_url, previous_url = page_links(request, page, page_size, count)
+    return JsonResponse({
+        'count': count,
+        'next': next_url,
+        'previous': previous_url,
+        'results': CollectionListSerializer(collections, many=True).data,
+    })
+
+
+@async_api_view(['GET'], login_required=True)
+async def collection_detail(request, user, pk):
+    detail_size = getattr(settings, 'COLLECTION_DETAIL_POSTS', 10)
+    collection = await get_collection(user, pk, Collection.objects.prefetch_related(Prefetch(
+        'memberships',
+        queryset=CollectionPost.objects.select_related('post').order_by('rank', 'id')[:detail_size],
+        to_attr='first_memberships'
+    )))
+    await sync_to_async(attach_archived_posts)(collection.first_memberships)
+    return JsonResponse(CollectionSerializer(collection).data)
+
+
+@async_api_view(['POST'], login_required=True)
+async def collection_add_post(request, user, pk):
+    collection = await get_collection(user, pk)
+    found, not_found = await requested_posts(request)
+
+    added = await sync_to_async(add_posts)(collection, found)
+    if added:
+        await notify('collection_posts_changed', {
+            'collection_id': collection.id,
+            'added': added,
+            'removed': []
+        })
+    return JsonResponse({'status': 'posts added', 'added': added, 'not_found': not_found})
+
+
+@async_api_view(['POST'], login_required=True)
+async def collection_remove_post(request, user, pk):
+    collection = await get_collection(user, pk)
+    found, not_found = await requested_posts(request)
+
+    removed = await sync_to_async(remove_posts)(collection, found)
+    if removed:
+        await notify('collection_posts_changed', {
+            'collection_id': collection.id,
+            'added': [],
+            'removed': removed
+        })
+    return JsonResponse({'status': 'posts removed', 'removed': removed, 'not_found': not_found})
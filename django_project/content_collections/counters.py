@@ -0,0 +1,161 @@
+import weakref
+
+from django.db.models import (
+    Case, Count, F, IntegerField, OuterRef, QuerySet, Subquery, Value, When
+)
+from django.db.models.functions import Coalesce
+
+from posts.models import Post
+from posts.versioning import bump_version, bump_versions
+
+from .lookups import invalidate_post_collections
+from .models import Collection, CollectionPost
+
+
+def _membership_count(field):
+    return Coalesce(
+        Subquery(
+            CollectionPost.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('id'))
+            .values('total'),
+            output_field=IntegerField()
+        ),
+        Value(0)
+    )
+
+
+def refresh_counts(collection_ids=(), post_ids=()):
+    """
+    Recompute the counters of the given rows from the membership table.
+    Used after set-based writes (bulk_create/queryset.delete) that do not
+    send m2m_changed.
+    """
+    if collection_ids:
+        Collection.objects.filter(pk__in=collection_ids).update(
+            post_count=_membership_count('collection')
+        )
+    if post_ids:
+        Post.objects.filter(pk__in=post_ids).update(
+            collection_count=_membership_count('post')
+        )
+        _bump_posts(post_ids)
+
+
+def _adjust(model, pks, delta):
+    if pks:
+        count_field = 'post_count' if model is Collection else 'collection_count'
+        model.objects.filter(pk__in=pks).update(**{count_field: F(count_field) + delta})
+
+
+def _bump_posts(post_ids):
+    # collection_count is part of the post representation.
+    bump_versions('post', post_ids)
+    bump_version('post', 'list')
+
+
+def _split(instance, reverse, pks):
+    """Return (collection_ids, post_ids) touched by an m2m change."""
+    if reverse:
+        return list(pks), [instance.pk]
+    return [instance.pk], list(pks)
+
+
+def membership_changed(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if action == 'pre_remove':
+        # pk_set holds the requested ids; only count rows that exist.
+        field = 'post_id' if reverse else 'collection_id'
+        other = 'collection_id' if reverse else 'post_id'
+        instance._removed_pks = set(CollectionPost.objects.filter(
+            **{field: instance.pk, f'{other}__in': pk_set}
+        ).values_list(other, flat=True))
+    elif action == 'pre_clear':
+        field = 'post_id' if reverse else 'collection_id'
+        other = 'collection_id' if reverse else 'post_id'
+        instance._removed_pks = set(CollectionPost.objects.filter(
+            **{field: instance.pk}
+        ).values_list(other, flat=True))
+    elif action == 'post_add' and pk_set:
+        # Django only reports the ids that were actually inserted.
+        collection_ids, post_ids = _split(instance, reverse, pk_set)
+        _adjust(Collection, collection_ids, len(post_ids))
+        _adjust(Post, post_ids, len(collection_ids))
+        _bump_posts(post_ids)
+    elif action in ('post_remove', 'post_clear'):
+        removed = getattr(instance, '_removed_pks', set())
+        instance._removed_pks = set()
+        if removed:
+            collection_ids, post_ids = _split(instance, reverse, removed)
+            _adjust(Collection, collection_ids, -len(post_ids))
+            _adjust(Post, post_ids, -len(collection_ids))
+            _bump_posts(post_ids)
+
+
+def collection_deleting(sender, instance, **kwargs):
+    post_ids = list(CollectionPost.objects.filter(
+        collection=instance
+    ).values_list('post_id', flat=True))
+    _adjust(Post, post_ids, -1)
+    if post_ids:
+        _bump_posts(post_ids)
+        invalidate_post_collections(instance.owner_id)
+
+
+def archived_post_deleting(sender, instance, **kwargs):
+    """
+    Memberships of an archived post have no cascade (no database
+    constraint, and the relation points at Post), so delete them with the
+    post and recount their collections.
+    """
+    memberships = CollectionPost.objects.filter(post_id=instance.pk)
+    collections = dict(
+        Collection.objects.filter(memberships__post_id=instance.pk).values_list('id', 'owner_id')
+    )
+    if collections:
+        memberships.delete()
+        refresh_counts(collection_ids=list(collections))
+        for owner_id in set(collections.values()):
+            invalidate_post_collections(owner_id)
+
+
+# Post QuerySet.delete() calls already counted, see post_deleting.
+_counted_deletes = weakref.WeakSet()
+
+
+def post_deleting(sender, instance, origin=None, **kwargs):
+    """
+    pre_delete on Post, so every delete path (API, admin, shell, a user
+    cascade) keeps post_count right. A Post QuerySet.delete() is counted
+    for all of its posts on its first row, in two queries however many
+    posts go; other deletes cost two queries per post.
+    """
+    if isinstance(origin, QuerySet) and origin.model is Post:
+        if origin in _counted_deletes:
+            return
+        _counted_deletes.add(origin)
+        _decrement_collections(origin.values('pk'))
+    else:
+        _decrement_collections([instance.pk])
+
+
+def _decrement_collections(post_ids):
+    """
+    Decrement the collections that lose members when `post_ids` go, and
+    invalidate their owners' post-collection lookups.
+    """
+    rows = list(
+        CollectionPost.objects.filter(post_id__in=post_ids)
+        .order_by()
+        .values_list('collection_id', 'collection__owner_id')
+        .annotate(total=Count('id'))
+    )
+    counts = {collection_id: total for collection_id, _, total in rows}
+    for owner_id in {owner_id for _, owner_id, _ in rows}:
+        invalidate_post_collections(owner_id)
+    if counts:
+        Collection.objects.filter(pk__in=counts).update(post_count=F('post_count') - Case(
+            *[When(pk=pk, then=Value(total)) for pk, total in counts.items()],
+            default=Value(0),
+            output_field=IntegerField()
+        ))
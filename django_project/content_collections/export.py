@@ -0,0 +1,24 @@
+from django.db.models import Prefetch
+
+from .models import Collection, CollectionPost
+
+COLLECTION_EXPORT_FIELDS = ['id', 'name', 'owner', 'created_at', 'updated_at', 'post_ids']
+
+
+def collection_rows(queryset=None, chunk_size=500):
+    queryset = Collection.objects.all() if queryset is None else queryset
+    queryset = queryset.select_related('owner').prefetch_related(
+        # Memberships rather than posts: archived posts are not joinable.
+        Prefetch('memberships', queryset=CollectionPost.objects.only(
+            'collection_id', 'post_id'
+        ).order_by('rank', 'id'))
+    ).order_by('id')
+    for collection in queryset.iterator(chunk_size=chunk_size):
+        yield {
+            'id': collection.id,
+            'name': collection.name,
+            'owner': collection.owner.username,
+            'created_at': collection.created_at,
+            'updated_at': collection.updated_at,
+            'post_ids': [membership.post_id for membership in collection.memberships.all()],
+        }
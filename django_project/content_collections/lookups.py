@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch
+
+from posts.archive import archived_posts
+from posts.models import Post
+from posts.versioning import bump_version, get_version
+
+from .models import CollectionPost
+
+
+def _cache():
+    return caches[getattr(settings, 'POST_COLLECTIONS_CACHE', 'default')]
+
+
+def collection_ids_for_posts(user_id, post_ids):
+    """
+    Map each of `post_ids` to the ids of the user's collections containing
+    it. Results are cached per user under a version stamp, so a cold batch
+    costs a single query on the (post, collection) index.
+    """
+    cache = _cache()
+    version = get_version('post-collections', user_id)
+    keys = {f'post-collections:{user_id}:{version}:{post_id}': post_id for post_id in post_ids}
+    results = {keys[key]: value for key, value in cache.get_many(list(keys)).items()}
+
+    missing = [post_id for post_id in post_ids if post_id not in results]
+    if missing:
+        found = {post_id: [] for post_id in missing}
+        rows = CollectionPost.objects.filter(
+            post_id__in=missing, collection__owner_id=user_id
+        ).order_by('post_id', 'collection_id').values_list('post_id', 'collection_id')
+        for post_id, collection_id in rows:
+            found[post_id].append(collection_id)
+        cache.set_many(
+            {key: found[post_id] for key, post_id in keys.items() if post_id in found},
+            getattr(settings, 'POST_COLLECTIONS_CACHE_TIMEOUT', 300)
+        )
+        results.update(found)
+    return {post_id: results[post_id] for post_id in post_ids}
+
+
+def preview_queryset():
+    """
+    Memberships in collection order, with the post fields previews show.
+    Archived posts are left out of previews.
+    """
+    return CollectionPost.objects.filter(
+        Exists(Post.objects.filter(pk=OuterRef('post_id')))
+    ).select_related('post').only(
+        'collection', 'post__id', 'post__title', 'post__excerpt'
+    ).order_by('rank', 'id')
+
+
+def preview_memberships(size):
+    """Prefetch of each collection's first `size` previews, as `preview_memberships`."""
+    return Prefetch('memberships', queryset=preview_queryset()[:size], to_attr='preview_memberships')
+
+
+def attach_archived_posts(memberships):
+    """
+    Fill in `post` on memberships of archived posts, which
+    select_related('post') leaves None, with one query for all of them.
+    """
+    missing = [membership for membership in memberships if membership.post is None]
+    if missing:
+        archived = archived_posts().in_bulk([membership.post_id for membership in missing])
+        field = CollectionPost._meta.get_field('post')
+        for membership in missing:
+            if membership.post_id in archived:
+                field.set_cached_value(membership, archived[membership.post_id])
+    return memberships
+
+
+def invalidate_post_collections(user_id):
+    # Bumping the stamp orphans every cached entry of the user at once. It
+    # waits for the commit: bumped earlier, a concurrent read could cache
+    # the old memberships under the new stamp.
+    transaction.on_commit(lambda: bump_version('post-collections', user_id))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from posts.export import export_stream, write_chunks
+
+from content_collections.export import COLLECTION_EXPORT_FIELDS, collection_rows
+from content_collections.models import Collection
+
+
+class Command(BaseCommand):
+    help = 'Stream collections with their post ids as NDJSON or CSV with constant memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', dest='output', choices=['ndjson', 'csv'], default='ndjson')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output with gzip')
+        parser.add_argument('--file', help='Output path (defaults to stdout)')
+        parser.add_argument('--owner', help='Only export collections of this username')
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        queryset = Collection.objects.all()
+        if options['owner']:
+            queryset = queryset.filter(owner__username=options['owner'])
+        chunks = export_stream(
+            collection_rows(queryset, chunk_size=options['chunk_size']),
+            COLLECTION_EXPORT_FIELDS,
+            output=options['output'],
+            compress=options['gzip']
+        )
+        write_chunks(chunks, options['file'])
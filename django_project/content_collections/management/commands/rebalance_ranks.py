@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from content_collections.ordering import collections_needing_rebalance, rebalance
+
+
+class Command(BaseCommand):
+    help = (
+        'Rewrite the rank keys of collections whose keys grew too long (or are '
+        'missing) after many moves. Meant to run periodically, e.g. from cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--collection', type=int, action='append', dest='collections',
+                            help='Rebalance this collection id regardless of key length')
+        parser.add_argument('--max-length', type=int,
+                            help='Rebalance collections with keys longer than this '
+                                 '(defaults to COLLECTION_RANK_MAX_LENGTH)')
+
+    def handle(self, *args, **options):
+        collection_ids = options['collections'] or list(
+            collections_needing_rebalance(options['max_length'])
+        )
+        for collection_id in collection_ids:
+            count = rebalance(collection_id)
+            self.stdout.write(f'Rebalanced collection {collection_id} ({count} posts)')
+        self.stdout.write(self.style.SUCCESS(f'Rebalanced {len(collection_ids)} collections'))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F
+
+from posts.models import Post
+
+from content_collections.counters import refresh_counts
+from content_collections.models import Collection
+
+
+class Command(BaseCommand):
+    help = 'Recompute Collection.post_count and Post.collection_count where they drifted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        fixed_collections = self._reconcile(
+            Collection.objects.annotate(actual=Count('memberships')).exclude(post_count=F('actual')),
+            batch_size,
+            lambda ids: refresh_counts(collection_ids=ids)
+        )
+        fixed_posts = self._reconcile(
+            Post.objects.annotate(actual=Count('collection_memberships')).exclude(collection_count=F('actual')),
+            batch_size,
+            lambda ids: refresh_counts(post_ids=ids)
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Reconciled {fixed_collections} collections and {fixed_posts} posts'
+        ))
+
+    def _reconcile(self, drifted, batch_size, refresh):
+        fixed = 0
+        last_id = 0
+        while True:
+            ids = list(
+                drifted.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                return fixed
+            refresh(ids)
+            fixed += len(ids)
+            last_id = ids[-1]
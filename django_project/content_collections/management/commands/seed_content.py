@@ -0,0 +1,106 @@
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post
+from posts.serializers import chunked
+
+from content_collections.models import Collection, CollectionPost
+from content_collections.ranking import ranks_after
+
+WORDS = (
+    'django python channels websocket postgres sqlite cache redis kafka spark '
+    'stream event latency index query search ranking cursor deploy docker '
+    'signal serializer viewset router collection post author token session'
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk-load users, posts and collections for benchmarks and local '
+        'testing. Counters and ranks are written directly, so no signals or '
+        'per-row saves are involved.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--collections', type=int, default=1000)
+        parser.add_argument('--posts-per-collection', type=int, default=50)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='seed', help='Username prefix of seeded users')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        post_total = options['posts']
+        per_collection = min(options['posts_per_collection'], post_total)
+
+        users = self._seed_users(options['users'], options['prefix'])
+
+        # Plan memberships first so posts are written with their final counters.
+        memberships = [
+            rng.sample(range(post_total), per_collection)
+            for _ in range(options['collections'])
+        ]
+        collection_counts = [0] * post_total
+        for indexes in memberships:
+            for index in indexes:
+                collection_counts[index] += 1
+
+        post_ids = []
+        for chunk in chunked(range(post_total), batch_size):
+            posts = []
+            for index in chunk:
+                post = Post(
+                    title=' '.join(rng.choices(WORDS, k=5)),
+                    body=' '.join(rng.choices(WORDS, k=rng.randint(30, 120))),
+                    author_id=users[index % len(users)],
+                    collection_count=collection_counts[index],
+                )
+                post.refresh_excerpt()
+                posts.append(post)
+            with transaction.atomic():
+                Post.objects.bulk_create(posts)
+            post_ids.extend(post.id for post in posts)
+
+        collections = Collection.objects.bulk_create([
+            Collection(
+                name=f'Collection {n}',
+                owner_id=users[n % len(users)],
+                post_count=per_collection
+            )
+            for n in range(len(memberships))
+        ], batch_size=batch_size)
+        ranks = ranks_after(None, per_collection)
+        rows = (
+            CollectionPost(collection_id=collection.id, post_id=post_ids[index], rank=rank)
+            for collection, indexes in zip(collections, memberships)
+            for index, rank in zip(indexes, ranks)
+        )
+        for chunk in chunked(list(rows), batch_size):
+            with transaction.atomic():
+                CollectionPost.objects.bulk_create(chunk)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(users)} users, {post_total} posts and {len(collections)} '
+            f'collections in {time.perf_counter() - started:.1f}s'
+        ))
+
+    def _seed_users(self, count, prefix):
+        # One hash for everyone: hashing per user would dominate the run.
+        password = make_password(None)
+        User.objects.bulk_create([
+            User(username=f'{prefix}-{n}', email=f'{prefix}-{n}@example.com', password=password)
+            for n in range(count)
+        ], ignore_conflicts=True)
+        return list(
+            User.objects.filter(username__startswith=f'{prefix}-')
+            .order_by('id').values_list('id', flat=True)[:count]
+        )
@@ -0,0 +1,75 @@
+"""
+Adding and removing collection posts, shared by the sync and async views.
+"""
+from posts.archive import existing_post_ids
+
+from .counters import refresh_counts
+from .lookups import invalidate_post_collections
+from .models import CollectionPost
+from .ordering import last_rank
+from .ranking import ranks_after
+
+
+def requested_post_ids(data):
+    """
+    The post ids a request body names, as either a single `post_id` or a
+    list of `post_ids`, or None when the body is not such an object.
+    """
+    if not isinstance(data, dict):
+        return None
+    post_ids = data.get('post_ids') if 'post_ids' in data else [data.get('post_id')]
+    if not isinstance(post_ids, list) or any(isinstance(post_id, bool) for post_id in post_ids):
+        return None
+    try:
+        return list(dict.fromkeys(int(post_id) for post_id in post_ids))
+    except (TypeError, ValueError):
+        return None
+
+
+def resolve_posts(post_ids):
+    """Split `post_ids` into (found, not_found), keeping their order."""
+    existing = existing_post_ids(post_ids)
+    found = [post_id for post_id in post_ids if post_id in existing]
+    not_found = [post_id for post_id in post_ids if post_id not in existing]
+    return found, not_found
+
+
+def _member_ids(collection, post_ids):
+    return set(CollectionPost.objects.filter(
+        collection=collection, post_id__in=post_ids
+    ).values_list('post_id', flat=True))
+
+
+def _changed(collection, post_ids):
+    refresh_counts(collection_ids=[collection.id], post_ids=post_ids)
+    invalidate_post_collections(collection.owner_id)
+
+
+def add_posts(collection, post_ids):
+    """
+    Append the posts among `post_ids` that are not in `collection` yet and
+    return their ids; only those are reported and broadcast.
+    """
+    members = _member_ids(collection, post_ids)
+    added = [post_id for post_id in post_ids if post_id not in members]
+    if added:
+        ranks = ranks_after(last_rank(collection.id), len(added))
+        CollectionPost.objects.bulk_create(
+            [
+                CollectionPost(collection=collection, post_id=post_id, rank=rank)
+                for post_id, rank in zip(added, ranks)
+            ],
+            ignore_conflicts=True
+        )
+        _changed(collection, added)
+    return added
+
+
+def remove_posts(collection, post_ids):
+    """Remove the posts among `post_ids` that are in `collection`; return their ids."""
+    members = _member_ids(collection, post_ids)
+    removed = [post_id for post_id in post_ids if post_id in members]
+    if removed:
+        CollectionPost.objects.filter(collection=collection, post_id__in=removed).delete()
+        _changed(collection, removed)
+    return removed
@@ -4,7 +4,13 @@ from django.contrib.auth.models import User
 class Collection(models.Model):
     name = models.CharField(max_length=200)
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
-    posts = models.ManyToManyField('posts.Post', related_name='collections')
+    posts = models.ManyToManyField(
+        'posts.Post',
+        through='CollectionPost',
+        related_name='collections'
+    )
+    # Denormalized, maintained by content_collections.counters
+    post_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -12,4 +18,32 @@ class Collection(models.Model):
         return f"{self.name} (by {self.owner.username})"
 
     class Meta:
-        ordering = ['-created_at'] 
\ No newline at end of file
+        ordering = ['-created_at']
+
+class CollectionPost(models.Model):
+    collection = models.ForeignKey(
+        Collection, on_delete=models.CASCADE, related_name='memberships'
+    )
+    # No database constraint: memberships keep the id of a post moved to
+    # posts.ArchivedPost. select_related('post') is then a LEFT JOIN that
+    # leaves `post` None for those; see lookups.attach_archived_posts.
+    post = models.ForeignKey(
+        'posts.Post', on_delete=models.CASCADE, related_name='collection_memberships',
+        null=True, db_constraint=False
+    )
+    added_at = models.DateTimeField(auto_now_add=True)
+    # Lexicographic position within the collection, see ranking.py
+    rank = models.CharField(max_length=255, blank=True, default='')
+
+    def __str__(self):
+        return f"{self.post_id} in {self.collection_id}"
+
+    class Meta:
+        # Keep the table of the implicit many-to-many this model replaced.
+        db_table = 'content_collections_collection_posts'
+        unique_together = [('collection', 'post')]
+        indexes = [
+            models.Index(fields=['collection', 'rank']),
+            # Reverse lookups: which collections contain a post.
+            models.Index(fields=['post', 'collection']),
+        ]
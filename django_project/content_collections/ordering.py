@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Length
+
+from .models import CollectionPost
+from .ranking import rank_between, ranks_after
+
+
+def last_rank(collection_id):
+    return CollectionPost.objects.filter(
+        collection_id=collection_id
+    ).order_by('-rank').values_list('rank', flat=True).first()
+
+
+def _neighbour_rank(collection_id, post_id, rank, after):
+    """Rank of the closest other post after (or before) `rank`."""
+    memberships = CollectionPost.objects.filter(
+        collection_id=collection_id
+    ).exclude(post_id=post_id)
+    if after:
+        memberships = memberships.filter(rank__gt=rank).order_by('rank')
+    else:
+        memberships = memberships.filter(rank__lt=rank).order_by('-rank')
+    return memberships.values_list('rank', flat=True).first()
+
+
+def move_post(collection_id, post_id, before_id=None, after_id=None):
+    """
+    Place `post_id` right after `after_id` or right before `before_id` by
+    rewriting only that post's rank. Returns the new rank, or None when
+    one of the posts is not in the collection.
+    """
+    anchor_id = after_id if after_id is not None else before_id
+    ranks = dict(CollectionPost.objects.filter(
+        collection_id=collection_id, post_id__in=[post_id, anchor_id]
+    ).values_list('post_id', 'rank'))
+    if post_id not in ranks or anchor_id not in ranks:
+        return None
+
+    anchor = ranks[anchor_id]
+    if after_id is not None:
+        lower, upper = anchor, _neighbour_rank(collection_id, post_id, anchor, after=True)
+    else:
+        lower, upper = _neighbour_rank(collection_id, post_id, anchor, after=False), anchor
+    try:
+        rank = rank_between(lower, upper)
+    except ValueError:
+        # Duplicate or missing keys leave no room; renumber and retry.
+        rebalance(collection_id)
+        return move_post(collection_id, post_id, before_id, after_id)
+
+    CollectionPost.objects.filter(
+        collection_id=collection_id, post_id=post_id
+    ).update(rank=rank)
+    return rank
+
+
+def rebalance(collection_id, chunk_size=1000):
+    """Rewrite every rank of a collection as short, evenly spaced keys."""
+    with transaction.atomic():
+        memberships = list(CollectionPost.objects.filter(
+            collection_id=collection_id
+        ).order_by('rank', 'id').only('id', 'rank'))
+        for membership, rank in zip(memberships, ranks_after(None, len(memberships))):
+            membership.rank = rank
+        CollectionPost.objects.bulk_update(memberships, ['rank'], batch_size=chunk_size)
+    return len(memberships)
+
+
+def collections_needing_rebalance(max_length=None):
+    max_length = max_length or getattr(settings, 'COLLECTION_RANK_MAX_LENGTH', 16)
+    return CollectionPost.objects.annotate(
+        rank_length=Length('rank')
+    ).filter(
+        Q(rank_length__gt=max_length) | Q(rank='')
+    ).order_by().values_list('collection_id', flat=True).distinct()
+
+
+def assign_missing_ranks(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Give rows added through the plain m2m API (collection.posts.add) a rank
+    at the end of their collection.
+    """
+    if action != 'post_add' or not pk_set:
+        return
+    collection_ids = pk_set if reverse else [instance.pk]
+    for collection_id in collection_ids:
+        unranked = list(CollectionPost.objects.filter(
+            collection_id=collection_id, rank=''
+        ).order_by('id').only('id'))
+        if not unranked:
+            continue
+        for membership, rank in zip(unranked, ranks_after(last_rank(collection_id), len(unranked))):
+            membership.rank = rank
+        CollectionPost.objects.bulk_update(unranked, ['rank'])
@@ -0,0 +1,73 @@
+"""
+Lexicographic rank keys for ordering posts inside a collection.
+
+Keys are strings over 0-9a-z, which sort the same way under byte-wise and
+locale-aware collations, so the database can order by them directly. A
+key can always be generated strictly between two neighbours, so moving a
+post only rewrites that post's key.
+"""
+
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+
+# Appended keys are fixed-width integers spaced STEP apart, starting in
+# the middle of the range, which leaves room for millions of appends and
+# for inserts between any two neighbours before keys start to grow.
+WIDTH = 7
+STEP = BASE ** 2
+START = BASE ** WIDTH // 2
+
+
+def _digit(key, index, default):
+    return DIGITS.index(key[index]) if index < len(key) else default
+
+
+def _encode(value, width=WIDTH):
+    digits = []
+    for _ in range(width):
+        value, remainder = divmod(value, BASE)
+        digits.append(DIGITS[remainder])
+    return ''.join(reversed(digits))
+
+
+def _decode(key, width=WIDTH):
+    value = 0
+    for index in range(width):
+        value = value * BASE + _digit(key, index, 0)
+    return value
+
+
+def rank_between(before=None, after=None):
+    """
+    Return a key that sorts strictly after `before` and strictly before
+    `after`; either bound may be None for the ends of the list.
+    """
+    if before and after is not None and before >= after:
+        raise ValueError(f'{before!r} must sort before {after!r}')
+
+    before = before or ''
+    key = ''
+    index = 0
+    while True:
+        low = _digit(before, index, 0)
+        high = _digit(after, index, BASE) if after is not None else BASE
+        if high - low > 1:
+            return key + DIGITS[(low + high) // 2]
+        # No room at this position: keep the lower digit and look further.
+        key += DIGITS[low]
+        if high - low == 1:
+            # Anything longer than this prefix already sorts before `after`.
+            after = None
+        index += 1
+
+
+def ranks_after(last=None, count=1):
+    """Return `count` increasing keys that all sort after `last`."""
+    value = START if not last else _decode(last) + STEP
+    if value + STEP * count < BASE ** WIDTH:
+        return [_encode(value + STEP * n) for n in range(count)]
+    keys = []
+    for _ in range(count):
+        last = rank_between(last, None)
+        keys.append(last)
+    return keys
@@ -1,15 +1,77 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import Collection
+from content_platform.fieldsets import SparseFieldsetSerializerMixin
+from .lookups import attach_archived_posts, preview_queryset
+from .models import Collection, CollectionPost
+from posts.models import Post
 from posts.serializers import PostSerializer
 
-class CollectionSerializer(serializers.ModelSerializer):
-    posts = PostSerializer(many=True, read_only=True)
+class CollectionSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    """
+    Detail representation. `posts` holds only the first
+    COLLECTION_DETAIL_POSTS posts in collection order; the rest are paginated through
+    /api/collections/{id}/posts/.
+    """
+    posts = serializers.SerializerMethodField()
     owner = serializers.ReadOnlyField(source='owner.username')
 
     class Meta:
         model = Collection
-        fields = ['id', 'name', 'owner', 'posts', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at']
+        fields = ['id', 'name', 'owner', 'post_count', 'posts', 'created_at', 'updated_at']
+        read_only_fields = ['post_count', 'created_at', 'updated_at']
+
+    def get_posts(self, obj):
+        memberships = getattr(obj, 'first_memberships', None)
+        if memberships is None:
+            limit = getattr(settings, 'COLLECTION_DETAIL_POSTS', 10)
+            memberships = CollectionPost.objects.filter(
+                collection=obj
+            ).select_related('post').order_by('rank', 'id')[:limit]
+        memberships = attach_archived_posts(list(memberships))
+        return PostSerializer(
+            [membership.post for membership in memberships if membership.post is not None],
+            many=True,
+            context=self.context
+        ).data
+
+class PostPreviewSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Post
+        fields = ['id', 'title', 'excerpt']
+
+class CollectionListSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    """
+    Lightweight list representation: a post count and a few post previews
+    instead of every nested post.
+    """
+    owner = serializers.ReadOnlyField(source='owner.username')
+    preview_posts = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Collection
+        fields = ['id', 'name', 'owner', 'post_count', 'preview_posts', 'created_at', 'updated_at']
+        read_only_fields = ['post_count', 'created_at', 'updated_at']
+
+    def get_preview_posts(self, obj):
+        memberships = getattr(obj, 'preview_memberships', None)
+        if memberships is None:
+            size = getattr(settings, 'COLLECTION_PREVIEW_POSTS', 3)
+            memberships = preview_queryset().filter(collection=obj)[:size]
+        return PostPreviewSerializer(
+            [membership.post for membership in memberships], many=True
+        ).data
+
+class CollectionPostSerializer(serializers.ModelSerializer):
+    """A post in a collection, flattened, with its membership details."""
+
+    class Meta:
+        model = CollectionPost
+        fields = ['added_at', 'rank']
+
+    def to_representation(self, instance):
+        data = PostSerializer(instance.post, context=self.context).data
+        data.update(super().to_representation(instance))
+        return data
 
 class CollectionCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -1,10 +1,23 @@
-from django.test import TestCase
+import io
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 from django.urls import reverse
-from rest_framework.test import APITestCase
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
 from rest_framework import status
+from content_platform.testing import QueryBudgetMixin
 from .models import Collection
-from posts.models import Post
+from .ordering import move_post
+from .ranking import rank_between, ranks_after
+from posts.models import ArchivedPost, Post
 from .serializers import CollectionSerializer
 
 class CollectionModelTest(TestCase):
@@ -44,7 +57,7 @@ class CollectionModelTest(TestCase):
         collection.posts.add(post)
         self.assertIn(post, collection.posts.all())
 
-class CollectionAPITest(APITestCase):
+class CollectionAPITest(QueryBudgetMixin, APITestCase):
     def setUp(self):
         self.user = User.objects.create_user(
             username='testuser',
@@ -58,7 +71,8 @@ class CollectionAPITest(APITestCase):
         data = {
             'name': 'New Collection'
         }
-        response = self.client.post(url, data, format='json')
+        with self.assertQueryBudget(3):
+            response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Collection.objects.count(), 1)
         self.assertEqual(Collection.objects.get().name, 'New Collection')
@@ -75,20 +89,128 @@ class CollectionAPITest(APITestCase):
         )
         
         url = reverse('collection-list')
-        response = self.client.get(url)
+        with self.assertQueryBudget(3):
+            response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 2)
         
+    def test_list_collections_uses_constant_queries(self):
+        for n in range(5):
+            collection = Collection.objects.create(
+                name=f'Collection {n}',
+                owner=self.user
+            )
+            for m in range(5):
+                collection.posts.add(Post.objects.create(
+                    title=f'Post {n}.{m}',
+                    body='Body',
+                    author=self.user
+                ))
+
+        url = reverse('collection-list')
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 5)
+        first = response.data['results'][0]
+        self.assertEqual(first['post_count'], 5)
+        self.assertEqual(len(first['preview_posts']), 3)
+        self.assertNotIn('posts', first)
+
+    def test_list_previews_follow_collection_order(self):
+        collection = Collection.objects.create(name='Ordered', owner=self.user)
+        posts = [
+            Post.objects.create(title=f'Post {n}', body='Body', author=self.user)
+            for n in range(4)
+        ]
+        collection.posts.add(*posts)
+        move_post(collection.id, posts[3].id, before_id=posts[0].id)
+        expected = [posts[3].id, posts[0].id, posts[1].id]
+        response = self.client.get(reverse('collection-list'))
+        previews = response.data['results'][0]['preview_posts']
+        self.assertEqual([post['id'] for post in previews], expected)
+        self.assertEqual(set(previews[0]), {'id', 'title', 'excerpt'})
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('async-collection-list'))
+        previews = response.json()['results'][0]['preview_posts']
+        self.assertEqual([post['id'] for post in previews], expected)
+
+    def test_list_collections_sparse_fields(self):
+        Collection.objects.create(name='Test Collection', owner=self.user)
+        response = self.client.get(reverse('collection-list'), {'fields': 'id'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data['results'][0]), {'id'})
+
+    def test_sparse_fields_leave_nested_posts_whole(self):
+        collection = Collection.objects.create(name='Test Collection', owner=self.user)
+        collection.posts.add(Post.objects.create(title='Post', body='Body', author=self.user))
+        response = self.client.get(
+            reverse('collection-detail', args=[collection.id]), {'fields': 'id,name,posts'}
+        )
+        self.assertEqual(set(response.data), {'id', 'name', 'posts'})
+        self.assertEqual(response.data['posts'][0]['title'], 'Post')
+
+        response = self.client.get(
+            reverse('collection-posts', args=[collection.id]), {'fields': 'id'}
+        )
+        self.assertEqual(response.data['results'][0]['title'], 'Post')
+
     def test_get_collection_detail(self):
         collection = Collection.objects.create(
             name='Test Collection',
             owner=self.user
         )
         url = reverse('collection-detail', args=[collection.id])
-        response = self.client.get(url)
+        with self.assertQueryBudget(2):
+            response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['name'], 'Test Collection')
         
+    @override_settings(COLLECTION_DETAIL_POSTS=2)
+    def test_collection_detail_inlines_first_posts(self):
+        collection = Collection.objects.create(
+            name='Test Collection',
+            owner=self.user
+        )
+        posts = [
+            Post.objects.create(title=f'Post {n}', body='Body', author=self.user)
+            for n in range(4)
+        ]
+        for post in posts:
+            collection.posts.add(post)
+
+        url = reverse('collection-detail', args=[collection.id])
+        with self.assertQueryBudget(2):
+            response = self.client.get(url)
+        self.assertEqual(response.data['post_count'], 4)
+        self.assertEqual(
+            [post['id'] for post in response.data['posts']],
+            [posts[0].id, posts[1].id]
+        )
+
+    def test_collection_posts_cursor_pagination(self):
+        collection = Collection.objects.create(
+            name='Test Collection',
+            owner=self.user
+        )
+        posts = [
+            Post.objects.create(title=f'Post {n}', body='Body', author=self.user)
+            for n in range(5)
+        ]
+        for post in posts:
+            collection.posts.add(post)
+
+        url = reverse('collection-posts', args=[collection.id])
+        with self.assertQueryBudget(2):
+            response = self.client.get(url, {'page_size': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = [post['id'] for post in response.data['results']]
+        self.assertIn('added_at', response.data['results'][0])
+        response = self.client.get(response.data['next'])
+        ids += [post['id'] for post in response.data['results']]
+        self.assertEqual(ids, [post.id for post in posts])
+        self.assertIsNone(response.data['next'])
+
     def test_update_collection(self):
         collection = Collection.objects.create(
             name='Original Name',
@@ -98,7 +220,8 @@ class CollectionAPITest(APITestCase):
         data = {
             'name': 'Updated Name'
         }
-        response = self.client.put(url, data, format='json')
+        with self.assertQueryBudget(5):
+            response = self.client.put(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         collection.refresh_from_db()
         self.assertEqual(collection.name, 'Updated Name')
@@ -109,7 +232,8 @@ class CollectionAPITest(APITestCase):
             owner=self.user
         )
         url = reverse('collection-detail', args=[collection.id])
-        response = self.client.delete(url)
+        with self.assertQueryBudget(6):
+            response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(Collection.objects.count(), 0)
         
@@ -126,7 +250,8 @@ class CollectionAPITest(APITestCase):
         
         url = reverse('collection-add-post', args=[collection.id])
         data = {'post_id': post.id}
-        response = self.client.post(url, data, format='json')
+        with self.assertQueryBudget(7):
+            response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn(post, collection.posts.all())
         
@@ -144,7 +269,8 @@ class CollectionAPITest(APITestCase):
         
         url = reverse('collection-remove-post', args=[collection.id])
         data = {'post_id': post.id}
-        response = self.client.post(url, data, format='json')
+        with self.assertQueryBudget(6):
+            response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertNotIn(post, collection.posts.all())
         
@@ -159,6 +285,428 @@ class CollectionAPITest(APITestCase):
         response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
+    def test_export_collections(self):
+        collection = Collection.objects.create(
+            name='Test Collection',
+            owner=self.user
+        )
+        post = Post.objects.create(
+            title='Test Post',
+            body='Test Body',
+            author=self.user
+        )
+        collection.posts.add(post)
+        other = User.objects.create_user(username='other', password='testpass123')
+        Collection.objects.create(name='Other Collection', owner=other)
+
+        url = reverse('collection-export')
+        response = self.client.get(url)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])['post_ids'], [post.id])
+
+    def test_add_and_remove_posts_in_batch(self):
+        collection = Collection.objects.create(
+            name='Test Collection',
+            owner=self.user
+        )
+        posts = [
+            Post.objects.create(title=f'Post {n}', body='Body', author=self.user)
+            for n in range(3)
+        ]
+        collection.posts.add(posts[0])
+        post_ids = [post.id for post in posts] + [999]
+
+        url = reverse('collection-add-post', args=[collection.id])
+        # collection, resolve ids (999 is also looked for in the archive),
+        # current members, last rank, insert, then refresh both counters
+        with self.assertNumQueries(8):
+            response = self.client.post(url, {'post_ids': post_ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['added'], post_ids[1:3])
+        self.assertEqual(response.data['not_found'], [999])
+        self.assertEqual(collection.posts.count(), 3)
+
+        url = reverse('collection-remove-post', args=[collection.id])
+        response = self.client.post(url, {'post_ids': post_ids[:2]}, format='json')
+        self.assertEqual(response.data['removed'], post_ids[:2])
+        self.assertEqual(list(collection.posts.all()), [posts[2]])
+        response = self.client.post(url, {'post_ids': post_ids[:2]}, format='json')
+        self.assertEqual(response.data['removed'], [])
+
+    def test_add_posts_rejects_invalid_ids(self):
+        collection = Collection.objects.create(
+            name='Test Collection',
+            owner=self.user
+        )
+        url = reverse('collection-add-post', args=[collection.id])
+        response = self.client.post(url, {'post_ids': 'abc'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        for body in ([1, 2], {'post_ids': [True]}):
+            response = self.client.post(url, body, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_update_broadcasts_compact_delta(self):
+        collection = Collection.objects.create(
+            name='Original Name',
+            owner=self.user
+        )
+        for n in range(3):
+            collection.posts.add(Post.objects.create(
+                title=f'Post {n}',
+                body='A long body ' * 100,
+                author=self.user
+            ))
+
+        url = reverse('collection-detail', args=[collection.id])
+        with mock.patch('content_collections.views.broadcaster') as broadcaster:
+            self.client.put(url, {'name': 'Updated Name'}, format='json')
+        event_type, data = broadcaster.publish.call_args[0]
+        self.assertEqual(event_type, 'collection_updated')
+        self.assertEqual(data['id'], collection.id)
+        self.assertEqual(data['changed'], {'name': 'Updated Name'})
+        self.assertIn('version', data)
+        self.assertNotIn('posts', data)
+
+    def test_move_post_reorders_with_single_update(self):
+        collection = Collection.objects.create(
+            name='Test Collection',
+            owner=self.user
+        )
+        posts = [
+            Post.objects.create(title=f'Post {n}', body='Body', author=self.user)
+            for n in range(4)
+        ]
+        self.client.post(
+            reverse('collection-add-post', args=[collection.id]),
+            {'post_ids': [post.id for post in posts]},
+            format='json'
+        )
+
+        url = reverse('collection-move-post', args=[collection.id])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                url, {'post_id': posts[3].id, 'before_id': posts[1].id}, format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        writes = [q['sql'] for q in queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(writes), 1)
+
+        self.client.post(url, {'post_id': posts[0].id, 'after_id': posts[2].id}, format='json')
+        response = self.client.get(
+            reverse('collection-posts', args=[collection.id]), {'page_size': 2}
+        )
+        ids = [post['id'] for post in response.data['results']]
+        response = self.client.get(response.data['next'])
+        ids += [post['id'] for post in response.data['results']]
+        self.assertEqual(ids, [posts[3].id, posts[1].id, posts[2].id, posts[0].id])
+
+    def test_move_post_validates_input(self):
+        collection = Collection.objects.create(
+            name='Test Collection',
+            owner=self.user
+        )
+        post = Post.objects.create(title='Post', body='Body', author=self.user)
+        collection.posts.add(post)
+        url = reverse('collection-move-post', args=[collection.id])
+
+        response = self.client.post(url, {'post_id': post.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(url, {'post_id': post.id, 'before_id': 999}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post(url, [post.id], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_post_collections_lookup_is_cached_and_invalidated(self):
+        cache.clear()
+        saved = Collection.objects.create(name='Saved', owner=self.user)
+        other = Collection.objects.create(name='Other', owner=self.user)
+        foreign = Collection.objects.create(
+            name='Foreign',
+            owner=User.objects.create_user(username='other', password='testpass123')
+        )
+        posts = [
+            Post.objects.create(title=f'Post {n}', body='Body', author=self.user)
+            for n in range(3)
+        ]
+        saved.posts.add(posts[0], posts[1])
+        foreign.posts.add(posts[0])
+
+        url = reverse('collection-containing')
+        query = {'post_ids': ','.join(str(post.id) for post in posts)}
+        # one membership query on a cold cache
+        with self.assertNumQueries(1):
+            response = self.client.get(url, query)
+        self.assertEqual(response.data['results'], [
+            {'post_id': posts[0].id, 'collection_ids': [saved.id]},
+            {'post_id': posts[1].id, 'collection_ids': [saved.id]},
+            {'post_id': posts[2].id, 'collection_ids': []},
+        ])
+        with self.assertNumQueries(0):
+            self.client.get(url, query)
+
+        # Invalidation runs on commit, which TestCase only simulates.
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.client.post(
+                reverse('collection-add-post', args=[other.id]), {'post_id': posts[0].id}, format='json'
+            )
+            with self.assertNumQueries(0):
+                response = self.client.get(url, query)
+            self.assertEqual(response.data['results'][0]['collection_ids'], [saved.id])
+        self.assertTrue(callbacks)
+        response = self.client.get(reverse('post-collections', args=[posts[0].id]))
+        self.assertEqual(response.data['collection_ids'], [saved.id, other.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('collection-remove-post', args=[saved.id]), {'post_id': posts[0].id}, format='json'
+            )
+        response = self.client.get(reverse('post-collections', args=[posts[0].id]))
+        self.assertEqual(response.data['collection_ids'], [other.id])
+
+        self.client.get(reverse('post-collections', args=[posts[1].id]))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('post-detail', args=[posts[1].id]))
+        response = self.client.get(reverse('post-collections', args=[posts[1].id]))
+        self.assertEqual(response.data['collection_ids'], [])
+
+        self.client.get(reverse('post-collections', args=[posts[0].id]))
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        response = self.client.get(reverse('post-collections', args=[posts[0].id]))
+        self.assertEqual(response.data['collection_ids'], [])
+
+        response = self.client.get(url, {'post_ids': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class AsyncCollectionAPITest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_login(self.user)
+
+    def test_create_add_remove_and_retrieve(self):
+        posts = [
+            Post.objects.create(title=f'Post {n}', body='Body', author=self.user)
+            for n in range(3)
+        ]
+        response = self.client.post(
+            reverse('async-collection-list'), {'name': 'Async'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        collection = Collection.objects.get(owner=self.user)
+
+        url = reverse('async-collection-add-post', args=[collection.id])
+        response = self.client.post(
+            url, {'post_ids': [post.id for post in posts] + [999]}, content_type='application/json'
+        )
+        self.assertEqual(response.json()['not_found'], [999])
+        response = self.client.post(url, [posts[0].id], content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        url = reverse('async-collection-remove-post', args=[collection.id])
+        self.client.post(url, {'post_id': posts[1].id}, content_type='application/json')
+
+        response = self.client.get(reverse('async-collection-detail', args=[collection.id]))
+        data = response.json()
+        self.assertEqual(data['post_count'], 2)
+        self.assertEqual([post['id'] for post in data['posts']], [posts[0].id, posts[2].id])
+
+        response = self.client.get(reverse('async-collection-list'))
+        self.assertEqual(response.json()['results'][0]['post_count'], 2)
+
+    def test_requires_owner(self):
+        other = User.objects.create_user(username='other', password='testpass123')
+        collection = Collection.objects.create(name='Theirs', owner=other)
+        response = self.client.get(reverse('async-collection-detail', args=[collection.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.client.logout()
+        response = self.client.get(reverse('async-collection-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+class RankingTest(TestCase):
+    def test_rank_between_sorts_between_neighbours(self):
+        keys = ranks_after(None, 3)
+        self.assertEqual(keys, sorted(keys))
+        low, high = keys[0], keys[1]
+        for _ in range(50):
+            middle = rank_between(low, high)
+            self.assertTrue(low < middle < high)
+            high = middle
+        self.assertTrue(rank_between(None, keys[0]) < keys[0])
+        self.assertTrue(rank_between(keys[-1], None) > keys[-1])
+
+    def test_rebalance_rewrites_long_keys(self):
+        user = User.objects.create_user(username='ranker', password='testpass123')
+        collection = Collection.objects.create(name='Ranked', owner=user)
+        posts = [
+            Post.objects.create(title=f'Post {n}', body='Body', author=user)
+            for n in range(3)
+        ]
+        collection.posts.add(*posts)
+        # Repeatedly moving the last post to the front grows its key.
+        for _ in range(60):
+            first = collection.memberships.order_by('rank').first().post_id
+            last = collection.memberships.order_by('rank').last().post_id
+            move_post(collection.id, last, before_id=first)
+        order = list(collection.memberships.order_by('rank').values_list('post_id', flat=True))
+        self.assertTrue(any(len(m.rank) > 7 for m in collection.memberships.all()))
+
+        call_command('rebalance_ranks', max_length=7, stdout=io.StringIO())
+        memberships = collection.memberships.order_by('rank')
+        self.assertEqual(list(memberships.values_list('post_id', flat=True)), order)
+        self.assertTrue(all(len(m.rank) == 7 for m in memberships))
+
+class MembershipCounterTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.collection = Collection.objects.create(
+            name='Test Collection',
+            owner=self.user
+        )
+        self.posts = [
+            Post.objects.create(title=f'Post {n}', body='Body', author=self.user)
+            for n in range(3)
+        ]
+
+    def assertCounts(self, post_count, collection_counts):
+        self.collection.refresh_from_db()
+        self.assertEqual(self.collection.post_count, post_count)
+        self.assertEqual(
+            [Post.objects.get(pk=post.pk).collection_count for post in self.posts],
+            collection_counts
+        )
+
+    def test_add_remove_and_clear_update_counters(self):
+        self.collection.posts.add(*self.posts)
+        self.collection.posts.add(self.posts[0])
+        self.assertCounts(3, [1, 1, 1])
+        self.collection.posts.remove(self.posts[0], self.posts[0])
+        self.assertCounts(2, [0, 1, 1])
+        self.posts[1].collections.remove(self.collection)
+        self.assertCounts(1, [0, 0, 1])
+        self.collection.posts.clear()
+        self.assertCounts(0, [0, 0, 0])
+
+    def test_deletes_update_counters(self):
+        other = Collection.objects.create(name='Other', owner=self.user)
+        self.collection.posts.add(*self.posts)
+        other.posts.add(self.posts[0])
+        other.delete()
+        self.assertCounts(3, [1, 1, 1])
+
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        client.delete(reverse('post-detail', args=[self.posts[2].id]))
+        client.delete(reverse('post-bulk'), {'ids': [self.posts[1].id]}, format='json')
+        self.posts = self.posts[:1]
+        self.assertCounts(1, [1])
+
+    def test_orm_deletes_update_counters(self):
+        author = User.objects.create_user(username='author')
+        extra = [Post.objects.create(title=f'Extra {n}', body='Body', author=author) for n in range(2)]
+        self.collection.posts.add(*self.posts, *extra)
+        Post.objects.filter(pk__in=[post.pk for post in self.posts[1:]]).delete()
+        self.posts[0].delete()
+        self.posts = []
+        self.assertCounts(2, [])
+        author.delete()
+        self.assertCounts(0, [])
+
+    def test_reconcile_counters_fixes_drift(self):
+        self.collection.posts.add(*self.posts)
+        Collection.objects.update(post_count=42)
+        Post.objects.update(collection_count=0)
+        call_command('reconcile_counters', stdout=io.StringIO())
+        self.assertCounts(3, [1, 1, 1])
+
+
+class ArchivedPostCollectionTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.collection = Collection.objects.create(name='Test Collection', owner=self.user)
+        self.posts = [
+            Post.objects.create(title=f'Post {n}', body='Body', author=self.user)
+            for n in range(3)
+        ]
+        self.collection.posts.add(*self.posts)
+        Post.objects.filter(pk=self.posts[1].pk).update(created_at=timezone.now() - timedelta(days=400))
+        call_command('archive_posts', days=365, stdout=io.StringIO())
+        self.ids = [post.id for post in self.posts]
+
+    def test_collection_reads_span_both_tiers(self):
+        response = self.client.get(reverse('collection-detail', args=[self.collection.id]))
+        self.assertEqual([post['id'] for post in response.data['posts']], self.ids)
+        self.assertEqual(response.data['posts'][1]['collection_count'], 1)
+
+        response = self.client.get(reverse('collection-posts', args=[self.collection.id]))
+        self.assertEqual([post['id'] for post in response.data['results']], self.ids)
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('async-collection-detail', args=[self.collection.id]))
+        self.assertEqual([post['id'] for post in response.json()['posts']], self.ids)
+
+        response = self.client.get(reverse('collection-export'))
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(json.loads(lines[0])['post_ids'], self.ids)
+
+    def test_archived_post_can_be_removed_and_added_back(self):
+        archived_id = self.posts[1].id
+        url = reverse('collection-remove-post', args=[self.collection.id])
+        response = self.client.post(url, {'post_id': archived_id}, format='json')
+        self.assertEqual(response.data['removed'], [archived_id])
+        self.collection.refresh_from_db()
+        self.assertEqual(self.collection.post_count, 2)
+
+        url = reverse('collection-add-post', args=[self.collection.id])
+        response = self.client.post(url, {'post_id': archived_id}, format='json')
+        self.assertEqual(response.data['added'], [archived_id])
+        response = self.client.get(reverse('collection-posts', args=[self.collection.id]))
+        self.assertEqual(response.data['results'][-1]['id'], archived_id)
+
+    def test_deleting_archived_post_drops_its_memberships(self):
+        author = User.objects.create_user(username='author')
+        ArchivedPost.objects.filter(pk=self.ids[1]).update(author=author)
+        author.delete()
+        response = self.client.get(reverse('collection-posts', args=[self.collection.id]))
+        self.assertEqual([post['id'] for post in response.data['results']], [self.ids[0], self.ids[2]])
+        self.collection.refresh_from_db()
+        self.assertEqual(self.collection.post_count, 2)
+
+
+class SeedContentTest(TestCase):
+    def test_seed_content_writes_consistent_counters_and_ranks(self):
+        call_command(
+            'seed_content', posts=40, users=3, collections=5,
+            posts_per_collection=8, batch_size=7, stdout=io.StringIO()
+        )
+        self.assertEqual(User.objects.filter(username__startswith='seed-').count(), 3)
+        self.assertEqual(Post.objects.count(), 40)
+        self.assertEqual(Collection.objects.count(), 5)
+
+        stored = {
+            (post.id, post.collection_count) for post in Post.objects.all()
+        }
+        Post.objects.update(collection_count=0)
+        Collection.objects.update(post_count=0)
+        call_command('reconcile_counters', stdout=io.StringIO())
+        self.assertEqual({(post.id, post.collection_count) for post in Post.objects.all()}, stored)
+        for collection in Collection.objects.all():
+            self.assertEqual(collection.post_count, 8)
+            ranks = collection.memberships.order_by('rank').values_list('rank', flat=True)
+            self.assertEqual(list(ranks), ranks_after(None, 8))
+
 class CollectionSerializerTest(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(
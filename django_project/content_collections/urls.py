@@ -1,10 +1,19 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CollectionViewSet
+from . import async_views
+from .views import CollectionViewSet, PostCollectionsView
 
 router = DefaultRouter()
 router.register(r'collections', CollectionViewSet, basename='collection')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('posts/<int:post_id>/collections/', PostCollectionsView.as_view(), name='post-collections'),
+    path('async/collections/', async_views.collection_list, name='async-collection-list'),
+    path('async/collections/<int:pk>/', async_views.collection_detail,
+         name='async-collection-detail'),
+    path('async/collections/<int:pk>/add_post/', async_views.collection_add_post,
+         name='async-collection-add-post'),
+    path('async/collections/<int:pk>/remove_post/', async_views.collection_remove_post,
+         name='async-collection-remove-post'),
 ] 
\ No newline at end of file
@@ -1,36 +1,93 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+from django.conf import settings
 from django.db import transaction
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
-from posts.models import Post
+from django.db.models import Prefetch
+from content_platform.fieldsets import SparseFieldsetViewMixin
+from posts.broadcast import broadcaster
+from posts.export import streaming_export_response
+from posts.versioning import bump_version
 
-from .models import Collection
-from .serializers import CollectionSerializer, CollectionCreateSerializer
+from .export import COLLECTION_EXPORT_FIELDS, collection_rows
+from .lookups import attach_archived_posts, collection_ids_for_posts, preview_memberships
+from .membership import add_posts, remove_posts, requested_post_ids, resolve_posts
+from .ordering import move_post
+from .models import Collection, CollectionPost
+from .serializers import (
+    CollectionCreateSerializer,
+    CollectionListSerializer,
+    CollectionPostSerializer,
+    CollectionSerializer,
+)
 
-class CollectionViewSet(viewsets.ModelViewSet):
+class CollectionPostPagination(CursorPagination):
+    ordering = ('rank', 'id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+class CollectionViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
+    queryset = Collection.objects.all()
     serializer_class = CollectionSerializer
     permission_classes = [IsAuthenticated]
+    max_lookup_posts = 100
 
     def get_queryset(self):
-        return Collection.objects.filter(owner=self.request.user)
+        queryset = super().get_queryset().filter(
+            owner=self.request.user
+        ).select_related('owner')
+        if self.action == 'list':
+            if 'preview_posts' in self.get_serializer().fields:
+                preview_size = getattr(settings, 'COLLECTION_PREVIEW_POSTS', 3)
+                queryset = queryset.prefetch_related(preview_memberships(preview_size))
+        elif self.action == 'retrieve':
+            detail_size = getattr(settings, 'COLLECTION_DETAIL_POSTS', 10)
+            queryset = queryset.prefetch_related(Prefetch(
+                'memberships',
+                queryset=CollectionPost.objects.select_related('post').order_by(
+                    'rank', 'id'
+                )[:detail_size],
+                to_attr='first_memberships'
+            ))
+        return queryset
 
     def get_serializer_class(self):
         if self.action == 'create':
             return CollectionCreateSerializer
+        if self.action == 'list':
+            return CollectionListSerializer
         return CollectionSerializer
 
     def perform_create(self, serializer):
         with transaction.atomic():
             collection = serializer.save(owner=self.request.user)
-            self._notify_websocket('collection_created', collection)
+            self._notify_websocket('collection_created', {
+                'id': collection.id,
+                'name': collection.name,
+                'owner': collection.owner.username
+            })
 
     def perform_update(self, serializer):
+        instance = serializer.instance
+        before = {
+            field: getattr(instance, field)
+            for field in serializer.validated_data
+        }
         with transaction.atomic():
             collection = serializer.save()
-            self._notify_websocket('collection_updated', collection)
+            changed = {
+                field: serializer.data[field]
+                for field, value in before.items()
+                if getattr(collection, field) != value and field in serializer.data
+            }
+            self._notify_websocket('collection_updated', {
+                'id': collection.id,
+                'changed': changed
+            })
 
     def perform_destroy(self, instance):
         collection_id = instance.id
@@ -38,53 +95,160 @@ class CollectionViewSet(viewsets.ModelViewSet):
             instance.delete()
             self._notify_websocket('collection_deleted', {'id': collection_id})
 
+    @action(detail=True, methods=['get'])
+    def posts(self, request, pk=None):
+        collection = self.get_object()
+        memberships = CollectionPost.objects.filter(
+            collection=collection
+        ).select_related('post')
+        paginator = CollectionPostPagination()
+        page = attach_archived_posts(paginator.paginate_queryset(memberships, request, view=self))
+        serializer = CollectionPostSerializer(
+            page, many=True, context=self.get_serializer_context()
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        output = request.query_params.get('output', 'ndjson')
+        if output not in ('ndjson', 'csv'):
+            return Response(
+                {'error': 'output must be ndjson or csv'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return streaming_export_response(
+            request,
+            collection_rows(Collection.objects.filter(owner=request.user)),
+            COLLECTION_EXPORT_FIELDS,
+            'collections',
+            output=output,
+            compress=request.query_params.get('compress') == 'gzip'
+        )
+
     @action(detail=True, methods=['post'])
     def add_post(self, request, pk=None):
         collection = self.get_object()
-        post_id = request.data.get('post_id')
-        
-        try:
-            post = Post.objects.get(id=post_id)
-            collection.posts.add(post)
-            self._notify_websocket('post_added_to_collection', {
+        post_ids = requested_post_ids(request.data)
+        if post_ids is None:
+            return self._invalid_post_ids()
+
+        found, not_found = resolve_posts(post_ids)
+        if not found:
+            return self._posts_not_found(not_found)
+
+        added = add_posts(collection, found)
+        if added:
+            self._notify_websocket('collection_posts_changed', {
                 'collection_id': collection.id,
-                'post_id': post.id
+                'added': added,
+                'removed': []
             })
-            return Response({'status': 'post added'})
-        except Post.DoesNotExist:
-            return Response(
-                {'error': 'Post not found'}, 
-                status=status.HTTP_404_NOT_FOUND
-            )
+        return Response({'status': 'posts added', 'added': added, 'not_found': not_found})
 
     @action(detail=True, methods=['post'])
     def remove_post(self, request, pk=None):
         collection = self.get_object()
-        post_id = request.data.get('post_id')
-        
-        try:
-            post = Post.objects.get(id=post_id)
-            collection.posts.remove(post)
-            self._notify_websocket('post_removed_from_collection', {
+        post_ids = requested_post_ids(request.data)
+        if post_ids is None:
+            return self._invalid_post_ids()
+
+        found, not_found = resolve_posts(post_ids)
+        if not found:
+            return self._posts_not_found(not_found)
+
+        removed = remove_posts(collection, found)
+        if removed:
+            self._notify_websocket('collection_posts_changed', {
                 'collection_id': collection.id,
-                'post_id': post.id
+                'added': [],
+                'removed': removed
             })
-            return Response({'status': 'post removed'})
-        except Post.DoesNotExist:
+        return Response({'status': 'posts removed', 'removed': removed, 'not_found': not_found})
+
+    @action(detail=False, methods=['get'])
+    def containing(self, request):
+        """Which of the user's collections contain each of `?post_ids=1,2,3`."""
+        try:
+            post_ids = list(dict.fromkeys(
+                int(post_id) for post_id in request.query_params.get('post_ids', '').split(',')
+            ))
+        except ValueError:
             return Response(
-                {'error': 'Post not found'}, 
+                {'error': 'post_ids must be a comma-separated list of post ids'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(post_ids) > self.max_lookup_posts:
+            return Response(
+                {'error': f'At most {self.max_lookup_posts} post_ids per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        found = collection_ids_for_posts(request.user.id, post_ids)
+        return Response({'results': [
+            {'post_id': post_id, 'collection_ids': collection_ids}
+            for post_id, collection_ids in found.items()
+        ]})
+
+    @action(detail=True, methods=['post'])
+    def move_post(self, request, pk=None):
+        collection = self.get_object()
+        data = request.data if isinstance(request.data, dict) else {}
+        try:
+            post_id = int(data.get('post_id'))
+            before_id = data.get('before_id')
+            after_id = data.get('after_id')
+            before_id = int(before_id) if before_id is not None else None
+            after_id = int(after_id) if after_id is not None else None
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'post_id and one of before_id/after_id must be post ids'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if (before_id is None) == (after_id is None) or post_id in (before_id, after_id):
+            return Response(
+                {'error': 'Give exactly one of before_id or after_id, other than post_id'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rank = move_post(collection.id, post_id, before_id=before_id, after_id=after_id)
+        if rank is None:
+            return Response(
+                {'error': 'Post not found in collection'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        self._notify_websocket('collection_post_moved', {
+            'collection_id': collection.id,
+            'post_id': post_id,
+            'rank': rank
+        })
+        return Response({'status': 'post moved', 'rank': rank})
+
+    def _invalid_post_ids(self):
+        return Response(
+            {'error': 'post_id or post_ids must be post ids'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    def _posts_not_found(self, not_found):
+        return Response(
+            {'error': 'Post not found', 'not_found': not_found},
+            status=status.HTTP_404_NOT_FOUND
+        )
 
     def _notify_websocket(self, event_type, data):
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            'notifications',
-            {
-                'type': 'notification.message',
-                'message': {
-                    'event_type': event_type,
-                    'data': CollectionSerializer(data).data if hasattr(data, 'id') else data
-                }
-            }
-        ) 
\ No newline at end of file
+        """
+        Broadcast a compact delta (ids and changed fields only) stamped with
+        the collection's new version; clients fetch details on demand, so
+        the payload does not grow with the collection.
+        """
+        collection_id = data.get('id', data.get('collection_id'))
+        data['version'] = bump_version('collection', collection_id)
+        broadcaster.publish(event_type, data) 
+
+class PostCollectionsView(APIView):
+    """The ids of the requesting user's collections that contain a post."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, post_id):
+        collection_ids = collection_ids_for_posts(request.user.id, [post_id])[post_id]
+        return Response({'post_id': post_id, 'collection_ids': collection_ids})
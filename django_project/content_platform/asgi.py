@@ -1,16 +1,25 @@
 import os
 from django.core.asgi import get_asgi_application
+from django.urls import re_path
 from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
-from posts.routing import websocket_urlpatterns
 
+# Run with DJANGO_SERVER_MODE=asgi; see SERVER_MODE in settings.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'content_platform.settings')
 
+django_asgi_app = get_asgi_application()
+
+from content_platform.authentication import TokenAuthMiddleware  # noqa: E402
+from posts.routing import http_urlpatterns, websocket_urlpatterns  # noqa: E402
+
 application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
-    "websocket": AuthMiddlewareStack(
+    "http": URLRouter(
+        http_urlpatterns + [
+            re_path(r'', django_asgi_app),
+        ]
+    ),
+    "websocket": TokenAuthMiddleware(
         URLRouter(
             websocket_urlpatterns
         )
     ),
-}) 
\ No newline at end of file
+})
@@ -0,0 +1,195 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs
+
+from channels.auth import AuthMiddlewareStack
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from jose import JWTError, jwt
+from rest_framework import authentication, exceptions
+
+from .models import AuthServiceAccount
+
+
+class TokenCache:
+    """
+    Bounded LRU of decoded token claims, so a client reusing its token only
+    pays for signature verification once per process.
+    """
+
+    def __init__(self, size=None):
+        self.size = size or getattr(settings, 'AUTH_SERVICE_TOKEN_CACHE_SIZE', 4096)
+        self._lock = threading.Lock()
+        self._claims = OrderedDict()
+
+    def get(self, token):
+        with self._lock:
+            claims = self._claims.get(token)
+            if claims is None:
+                return None
+            if claims.get('exp', float('inf')) <= time.time():
+                del self._claims[token]
+                return None
+            self._claims.move_to_end(token)
+            return claims
+
+    def set(self, token, claims):
+        with self._lock:
+            self._claims[token] = claims
+            self._claims.move_to_end(token)
+            while len(self._claims) > self.size:
+                self._claims.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._claims.clear()
+
+
+token_cache = TokenCache()
+
+
+def decode_token(token):
+    """
+    Verify an auth_service access token and return its claims. Raises
+    JWTError when the token is malformed, forged or expired.
+    """
+    claims = token_cache.get(token)
+    if claims is None:
+        secret = getattr(settings, 'AUTH_SERVICE_SECRET_KEY', '')
+        if not secret:
+            raise JWTError('AUTH_SERVICE_SECRET_KEY is not configured')
+        claims = jwt.decode(
+            token, secret,
+            algorithms=[getattr(settings, 'AUTH_SERVICE_ALGORITHM', 'HS256')]
+        )
+        if not claims.get('sub'):
+            raise JWTError('Token has no subject')
+        token_cache.set(token, claims)
+    return claims
+
+
+def _user_cache_key(subject):
+    return 'auth-user:' + hashlib.md5(subject.encode()).hexdigest()
+
+
+def _create_account(subject):
+    """
+    Create the user for a new auth_service subject. Its username is the
+    subject when that is free and otherwise derived from it; an existing
+    user is never reused.
+    """
+    usernames = (subject[:150], 'auth-' + hashlib.sha256(subject.encode()).hexdigest()[:40])
+    for username in usernames:
+        try:
+            with transaction.atomic():
+                user = User(username=username)
+                user.set_unusable_password()
+                user.save()
+                return AuthServiceAccount.objects.create(subject=subject, user=user)
+        except IntegrityError:
+            # Either the subject was linked concurrently by another request,
+            # or the username belongs to an unrelated user.
+            account = AuthServiceAccount.objects.select_related('user').filter(subject=subject).first()
+            if account is not None:
+                return account
+    raise IntegrityError(f'No free username for auth_service subject {subject!r}')
+
+
+def get_user_for_subject(subject):
+    """
+    Return the Django user linked to an auth_service subject (the token's
+    `sub`), creating both on first sight. Users are cached for
+    AUTH_USER_CACHE_TIMEOUT seconds, so changes such as deactivation take
+    up to that long to apply.
+    """
+    cache = caches[getattr(settings, 'AUTH_USER_CACHE', 'default')]
+    key = _user_cache_key(subject)
+    user = cache.get(key)
+    if user is None:
+        account = AuthServiceAccount.objects.select_related('user').filter(subject=subject).first()
+        if account is None:
+            account = _create_account(subject)
+        user = account.user
+        cache.set(key, user, getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60))
+    return user
+
+
+def authenticate_token(token):
+    """Return (user, claims) for a token; raises JWTError when invalid."""
+    claims = decode_token(token)
+    return get_user_for_subject(claims['sub']), claims
+
+
+class AuthServiceJWTAuthentication(authentication.BaseAuthentication):
+    """
+    `Authorization: Bearer <token>` with access tokens issued by
+    auth_service, verified in process with the shared signing key.
+    """
+
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        header = authentication.get_authorization_header(request).split()
+        if not header or header[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(header) != 2:
+            raise exceptions.AuthenticationFailed('Invalid bearer header.')
+        try:
+            user, claims = authenticate_token(header[1].decode())
+        except (JWTError, UnicodeError):
+            raise exceptions.AuthenticationFailed('Invalid or expired token.')
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        return user, claims
+
+    def authenticate_header(self, request):
+        return self.keyword
+
+
+class TokenAuthMiddleware:
+    """
+    Authenticates websocket connects from an auth_service token, given as
+    `?token=...` or as the subprotocol pair ['bearer', token] (browsers
+    cannot set headers on a websocket). With the claims and the user both
+    cached, a reconnect storm is resolved without touching the database.
+    Connects without a token fall through to the session middleware.
+    """
+
+    subprotocol = 'bearer'
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.session_inner = AuthMiddlewareStack(inner)
+
+    async def __call__(self, scope, receive, send):
+        token, subprotocol = self.get_token(scope)
+        if token is None:
+            return await self.session_inner(scope, receive, send)
+        scope = dict(
+            scope,
+            user=await self.resolve_user(token),
+            auth_subprotocol=subprotocol
+        )
+        return await self.inner(scope, receive, send)
+
+    def get_token(self, scope):
+        """Return (token, subprotocol to accept with) or (None, None)."""
+        subprotocols = scope.get('subprotocols') or []
+        if subprotocols and subprotocols[0].lower() == self.subprotocol and len(subprotocols) > 1:
+            return subprotocols[1], subprotocols[0]
+        query = parse_qs(scope.get('query_string', b'').decode())
+        token = query.get('token', [None])[0]
+        return token, None
+
+    async def resolve_user(self, token):
+        try:
+            claims = decode_token(token)
+        except JWTError:
+            return AnonymousUser()
+        user = await database_sync_to_async(get_user_for_subject)(claims['sub'])
+        return user if user.is_active else AnonymousUser()
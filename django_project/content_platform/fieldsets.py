@@ -0,0 +1,70 @@
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _requested(request, param):
+    # Writes keep every field: dropping one would silently ignore it in
+    # the request body.
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    value = request.query_params.get(param)
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def _is_view_serializer(serializer):
+    # Only the serializer the view itself builds is narrowed: the fields a
+    # client names are top-level ones, so posts nested in a collection keep
+    # all of theirs.
+    view = serializer.context.get('view')
+    return (
+        view is not None
+        and serializer.parent is None
+        and isinstance(serializer, view.get_serializer_class())
+    )
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    Lets clients narrow a serializer with ?fields=a,b or ?exclude=c.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not _is_view_serializer(self):
+            return
+        request = self.context.get('request')
+        fields = _requested(request, 'fields')
+        exclude = _requested(request, 'exclude')
+        for name in list(self.fields):
+            if (fields is not None and name not in fields) or (exclude and name in exclude):
+                self.fields.pop(name)
+
+
+class SparseFieldsetViewMixin:
+    """
+    Defers the model columns that no remaining serializer field reads, so
+    a sparse list or detail request does not load them from the database.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method not in SAFE_METHODS or not (
+            'fields' in self.request.query_params or 'exclude' in self.request.query_params
+        ):
+            return queryset
+
+        used = {
+            field.source.split('.')[0]
+            for field in self.get_serializer().fields.values()
+        }
+        # Foreign keys stay loaded: views may still select_related() them
+        # after this runs, and Django refuses to traverse a deferred field.
+        model = queryset.model
+        deferred = [
+            field.name for field in model._meta.concrete_fields
+            if field.name not in used
+            and not field.primary_key
+            and not field.is_relation
+        ]
+        return queryset.defer(*deferred) if deferred else queryset
@@ -0,0 +1,16 @@
+from django.contrib.auth.models import User
+from django.db import models
+
+
+class AuthServiceAccount(models.Model):
+    """
+    Links an auth_service subject (the `sub` of its tokens) to the Django
+    user created for it. auth_service does not verify emails, so a subject
+    is never matched to an existing user by email.
+    """
+    subject = models.CharField(max_length=255, unique=True)
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='auth_service_account')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.subject
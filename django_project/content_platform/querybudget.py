@@ -0,0 +1,172 @@
+"""
+Per-request SQL accounting: query count, total SQL time and repeated query
+shapes, the usual signature of an N+1.
+"""
+import functools
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.utils.decorators import sync_and_async_middleware
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_SAVEPOINT = re.compile(r'"?s\d+_x\d+"?')
+_NUMBER = re.compile(r'\b\d+\b')
+
+
+def query_shape(sql):
+    """Normalise SQL so that queries differing only in values compare equal."""
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _SAVEPOINT.sub('?', sql)
+    return _NUMBER.sub('?', sql)
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.queries = []
+        self.shapes = Counter()
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.count += 1
+                self.duration += elapsed
+                self.queries.append(sql)
+                self.shapes[query_shape(sql)] += 1
+
+    @property
+    def duplicates(self):
+        """Shapes run more than once, with how many times they ran."""
+        return {shape: count for shape, count in self.shapes.items() if count > 1}
+
+    @property
+    def duplicate_count(self):
+        return sum(count - 1 for count in self.shapes.values())
+
+
+@contextmanager
+def record_queries(using=None):
+    """Record the queries run on the current thread's connection(s)."""
+    stats = QueryStats()
+    aliases = [using] if using else list(connections)
+    with _wrapped(stats, aliases):
+        yield stats
+
+
+@contextmanager
+def _wrapped(stats, aliases):
+    if not aliases:
+        yield
+        return
+    with connections[aliases[0]].execute_wrapper(stats):
+        with _wrapped(stats, aliases[1:]):
+            yield
+
+
+_context_wrappers = ContextVar('query_wrappers', default=())
+
+
+def _run_context_wrappers(execute, sql, params, many, context):
+    for wrapper in _context_wrappers.get():
+        execute = functools.partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+def _install(connection):
+    if _run_context_wrappers not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_run_context_wrappers)
+
+
+@receiver(connection_created)
+def _install_on_connect(sender, connection, **kwargs):
+    _install(connection)
+
+
+for _connection in connections.all(initialized_only=True):
+    _install(_connection)
+
+
+@contextmanager
+def context_execute_wrapper(wrapper):
+    """
+    Like connection.execute_wrapper(), but for every connection the current
+    context queries through, including the per-request thread that async
+    code hands its ORM calls to with sync_to_async.
+    """
+    token = _context_wrappers.set((*_context_wrappers.get(), wrapper))
+    try:
+        yield
+    finally:
+        _context_wrappers.reset(token)
+
+
+@sync_and_async_middleware
+class QueryBudgetMiddleware:
+    """
+    Adds X-Query-Count, X-Query-Time-Ms and X-Query-Duplicates headers when
+    DEBUG is on. Otherwise hands the numbers to QUERY_METRICS_CALLBACK (a
+    dotted path to `callback(request, response, stats)`) or logs them, and
+    warns about requests above QUERY_BUDGET_WARN queries.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        callback = getattr(settings, 'QUERY_METRICS_CALLBACK', None)
+        self.callback = import_string(callback) if callback else None
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with record_queries() as stats:
+            response = self.get_response(request)
+        return self.report(request, response, stats)
+
+    async def __acall__(self, request):
+        # Async views run their queries in sync_to_async threads, out of
+        # reach of this thread's connections; follow the context instead.
+        stats = QueryStats()
+        with context_execute_wrapper(stats):
+            response = await self.get_response(request)
+        return self.report(request, response, stats)
+
+    def report(self, request, response, stats):
+        if settings.DEBUG:
+            response['X-Query-Count'] = str(stats.count)
+            response['X-Query-Time-Ms'] = f'{stats.duration * 1000:.2f}'
+            response['X-Query-Duplicates'] = str(stats.duplicate_count)
+        if self.callback is not None:
+            self.callback(request, response, stats)
+        else:
+            logger.info(
+                'sql queries=%d time_ms=%.2f duplicates=%d %s %s',
+                stats.count, stats.duration * 1000, stats.duplicate_count,
+                request.method, request.path
+            )
+        budget = getattr(settings, 'QUERY_BUDGET_WARN', None)
+        if budget is not None and stats.count > budget:
+            logger.warning(
+                'Query budget exceeded: %d queries (budget %d) for %s %s',
+                stats.count, budget, request.method, request.path
+            )
+        return response
@@ -0,0 +1,31 @@
+from contextlib import contextmanager
+
+from .querybudget import record_queries
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin declaring how many queries a block may run:
+
+        with self.assertQueryBudget(3):
+            self.client.get(url)
+
+    Unlike assertNumQueries, staying under the budget passes, and repeated
+    query shapes (N+1) fail unless allowed with `duplicates`.
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, queries, duplicates=0, using='default'):
+        with record_queries(using) as stats:
+            yield stats
+        problems = []
+        if stats.count > queries:
+            problems.append(f'{stats.count} queries, budget is {queries}')
+        if stats.duplicate_count > duplicates:
+            problems.append(
+                f'{stats.duplicate_count} repeated queries, budget is {duplicates}'
+            )
+        if problems:
+            details = [f'{count}x {shape}' for shape, count in stats.duplicates.items()]
+            details += [f'{n}. {sql}' for n, sql in enumerate(stats.queries, start=1)]
+            self.fail('; '.join(problems) + '\n' + '\n'.join(details))
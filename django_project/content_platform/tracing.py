@@ -0,0 +1,221 @@
+"""
+Lightweight tracing from an HTTP write to the websocket delivery it causes.
+
+Context travels as a W3C `traceparent` (00-<trace id>-<span id>-<flags>):
+requests may send one (auth_service or any gateway), responses return the
+request span's, and channel-layer messages carry the sending span's so the
+consumer's `websocket.send` span joins the same trace. Finished spans go to
+the exporter named by TRACING_EXPORTER; with none configured, spans are not
+created at all.
+"""
+import json
+import logging
+import re
+import secrets
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connection
+from django.dispatch import receiver
+from django.utils.decorators import sync_and_async_middleware
+from django.utils.module_loading import import_string
+
+from .querybudget import context_execute_wrapper, query_shape
+
+logger = logging.getLogger(__name__)
+
+_TRACEPARENT = re.compile(r'^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+SpanContext = namedtuple('SpanContext', ['trace_id', 'span_id'])
+
+_current_span = ContextVar('current_span', default=None)
+
+
+def parse_traceparent(value):
+    """The SpanContext in a traceparent header, or None if it is not valid."""
+    match = _TRACEPARENT.match((value or '').strip().lower())
+    if not match:
+        return None
+    version, trace_id, span_id, _ = match.groups()
+    if version == 'ff' or not int(trace_id, 16) or not int(span_id, 16):
+        return None
+    return SpanContext(trace_id, span_id)
+
+
+def format_traceparent(context):
+    return f'00-{context.trace_id}-{context.span_id}-01'
+
+
+class Span:
+    def __init__(self, name, trace_id, parent_id=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = attributes or {}
+        self.start = time.time()
+        self.duration = None
+        self._started = time.perf_counter()
+
+    @property
+    def traceparent(self):
+        return format_traceparent(self)
+
+    def end(self):
+        self.duration = time.perf_counter() - self._started
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': self.start,
+            'duration_ms': self.duration * 1000 if self.duration is not None else None,
+            'attributes': self.attributes,
+        }
+
+
+class InMemoryExporter:
+    """Keeps finished spans in a list; for tests and local debugging."""
+
+    def __init__(self):
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def clear(self):
+        with self._lock:
+            self.spans = []
+
+
+class JsonLinesExporter:
+    """Appends one JSON object per span to TRACING_FILE."""
+
+    def __init__(self, path=None):
+        self.path = path or settings.TRACING_FILE
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock, open(self.path, 'a') as output:
+            output.write(line + '\n')
+
+
+class LoggingExporter:
+    def export(self, span):
+        logger.info('span %s', json.dumps(span.to_dict(), default=str))
+
+
+_exporter = None
+
+
+def get_exporter():
+    global _exporter
+    path = getattr(settings, 'TRACING_EXPORTER', None)
+    if not path:
+        return None
+    if _exporter is None:
+        _exporter = import_string(path)()
+    return _exporter
+
+
+@receiver(setting_changed)
+def _reset_exporter(setting, **kwargs):
+    global _exporter
+    if setting in ('TRACING_EXPORTER', 'TRACING_FILE'):
+        _exporter = None
+
+
+def current_traceparent():
+    span = _current_span.get()
+    return span.traceparent if span is not None else None
+
+
+@contextmanager
+def start_span(name, parent=None, **attributes):
+    """
+    Time the block as a span, a child of `parent` (a traceparent string)
+    when given and of the current span otherwise. Yields None when tracing
+    is off.
+    """
+    exporter = get_exporter()
+    if exporter is None:
+        yield None
+        return
+
+    context = parse_traceparent(parent) if parent else _current_span.get()
+    if context is None:
+        span = Span(name, secrets.token_hex(16), attributes=attributes)
+    else:
+        span = Span(name, context.trace_id, parent_id=context.span_id, attributes=attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except Exception as exc:
+        span.attributes['error'] = type(exc).__name__
+        raise
+    finally:
+        span.end()
+        _current_span.reset(token)
+        exporter.export(span)
+
+
+def _trace_query(execute, sql, params, many, context):
+    with start_span('db.query', statement=query_shape(sql)):
+        return execute(sql, params, many, context)
+
+
+@sync_and_async_middleware
+class TracingMiddleware:
+    """
+    Opens an `http.request` span per request, continuing the caller's
+    traceparent, with a `db.query` span per SQL statement, and returns the
+    request span as the response's traceparent header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if get_exporter() is None:
+            return self.get_response(request)
+
+        with self.request_span(request) as span:
+            with connection.execute_wrapper(_trace_query):
+                response = self.get_response(request)
+            span.attributes['status'] = response.status_code
+        response['traceparent'] = span.traceparent
+        return response
+
+    async def __acall__(self, request):
+        if get_exporter() is None:
+            return await self.get_response(request)
+
+        with self.request_span(request) as span:
+            with context_execute_wrapper(_trace_query):
+                response = await self.get_response(request)
+            span.attributes['status'] = response.status_code
+        response['traceparent'] = span.traceparent
+        return response
+
+    def request_span(self, request):
+        return start_span(
+            'http.request',
+            parent=request.headers.get('traceparent'),
+            method=request.method,
+            path=request.path
+        )
@@ -1,5 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_migrate, post_save
 
 class PostsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'posts' 
\ No newline at end of file
+    name = 'posts'
+
+    def ready(self):
+        from .cache import post_changed
+        from .models import ArchivedPost, Post
+        from .search import install_search_index
+        post_migrate.connect(install_search_index, sender=self)
+        post_save.connect(post_changed, sender=Post)
+        post_delete.connect(post_changed, sender=Post)
+        post_delete.connect(post_changed, sender=ArchivedPost)
@@ -0,0 +1,93 @@
+"""
+Hot/cold split of posts. Posts older than POST_ARCHIVE_AFTER_DAYS move, ids
+unchanged, from Post to ArchivedPost, so the hot table and its indexes stay
+small. Retrieval by id and collection memberships cover both tiers.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ArchivedPost, Post
+from .versioning import bump_version, bump_versions
+
+ARCHIVED_FIELDS = ['id', 'title', 'body', 'excerpt', 'created_at', 'updated_at', 'author_id']
+
+
+def archived_posts():
+    """ArchivedPost rows with `collection_count` computed from memberships."""
+    memberships = Post.collections.through.objects.filter(
+        post_id=OuterRef('pk')
+    ).order_by().values('post_id').annotate(total=Count('id')).values('total')
+    return ArchivedPost.objects.annotate(
+        collection_count=Coalesce(Subquery(memberships, output_field=IntegerField()), Value(0))
+    )
+
+
+def get_post(pk):
+    """Post `pk` from the hot table, or else from the archive."""
+    try:
+        return Post.objects.get(pk=pk)
+    except Post.DoesNotExist:
+        archived = archived_posts().filter(pk=pk).first()
+        if archived is None:
+            raise
+        return archived
+
+
+def existing_post_ids(post_ids):
+    """The ids among `post_ids` of posts in either tier."""
+    existing = set(Post.objects.filter(pk__in=post_ids).order_by().values_list('id', flat=True))
+    missing = [post_id for post_id in post_ids if post_id not in existing]
+    if missing:
+        existing.update(
+            ArchivedPost.objects.filter(pk__in=missing).order_by().values_list('id', flat=True)
+        )
+    return existing
+
+
+def archive_cutoff(days=None):
+    if days is None:
+        days = getattr(settings, 'POST_ARCHIVE_AFTER_DAYS', 365)
+    return timezone.now() - timedelta(days=days)
+
+
+def _delete_rows(model, pks):
+    """DELETE rows by primary key, without collecting or cascading."""
+    conn = connections[router.db_for_write(model)]
+    quote = conn.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(pks))
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(model._meta.db_table)} '
+            f'WHERE {quote(model._meta.pk.column)} IN ({placeholders})',
+            pks
+        )
+
+
+def archive_batch(cutoff, batch_size):
+    """
+    Move up to `batch_size` of the oldest posts created before `cutoff` to
+    the archive in one transaction and return their ids. Rows locked by a
+    concurrent write are skipped until a later run.
+    """
+    with transaction.atomic():
+        rows = list(
+            Post.objects.filter(created_at__lt=cutoff)
+            .order_by('created_at', 'id')
+            .select_for_update(skip_locked=True)
+            .values(*ARCHIVED_FIELDS)[:batch_size]
+        )
+        if not rows:
+            return []
+        ArchivedPost.objects.bulk_create([ArchivedPost(**row) for row in rows])
+        ids = [row['id'] for row in rows]
+        # A plain DELETE: the ORM cascade would drop the posts' collection
+        # memberships, which stay and point at the archived ids.
+        _delete_rows(Post, ids)
+    bump_versions('post', ids)
+    bump_version('post', 'list')
+    return ids
@@ -0,0 +1,83 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from content_platform.async_api import APIError, async_api_view, json_body
+
+from .archive import get_post
+from .broadcast import broadcaster
+from .cache import cached_post_data
+from .models import Post
+from .serializers import PostSerializer
+
+
+def page_links(request, page, page_size, count):
+    """`next`/`previous` links in the shape of DRF's PageNumberPagination."""
+    url = request.build_absolute_uri()
+    next_url = replace_query_param(url, 'page', page + 1) if page * page_size < count else None
+    previous_url = None
+    if page == 2:
+        previous_url = remove_query_param(url, 'page')
+    elif page > 2:
+        previous_url = replace_query_param(url, 'page', page - 1)
+    return next_url, previous_url
+
+
+def requested_page(request):
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        page = 0
+    if page < 1:
+        raise APIError(404, {'detail': 'Invalid page.'})
+    return page
+
+
+@async_api_view(['GET', 'POST'])
+async def post_list(request, user):
+    if request.method == 'POST':
+        return await create_post(request)
+
+    page = requested_page(request)
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    queryset = Post.objects.all()
+    count = await queryset.acount()
+    offset = (page - 1) * page_size
+    if offset and offset >= count:
+        raise APIError(404, {'detail': 'Invalid page.'})
+    posts = [post async for post in queryset[offset:offset + page_size]]
+    next_url, previous_url = page_links(request, page, page_size, count)
+    return JsonResponse({
+        'count': count,
+        'next': next_url,
+        'previous': previous_url,
+        'results': PostSerializer(posts, many=True).data,
+    })
+
+
+async def create_post(request):
+    data = json_body(request)
+    if not isinstance(data, dict):
+        raise APIError(400, {'error': 'Expected an object'})
+    serializer = PostSerializer(data=data)
+    # In a thread: validating `author` looks the user up.
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors, status=400)
+
+    post = await Post.objects.acreate(**serializer.validated_data)
+    data = PostSerializer(post).data
+    await broadcaster.apublish('post_created', data)
+    return JsonResponse(data, status=201)
+
+
+@async_api_view(['GET'])
+async def post_detail(request, user, pk):
+    def load():
+        return PostSerializer(get_post(pk)).data
+
+    try:
+        data = await sync_to_async(cached_post_data)(pk, load)
+    except Post.DoesNotExist:
+        raise APIError(404, {'detail': 'Not found.'})
+    return JsonResponse(data)
@@ -0,0 +1,261 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from content_platform.tracing import current_traceparent, start_span
+
+from .replay import get_replay_buffer
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATIONS_GROUP = 'notifications'
+
+MEMBERSHIP_EVENT = 'collection_posts_changed'
+
+# Stands in for the flush timer while it is being set up.
+_SCHEDULING = object()
+
+
+class EventBroadcaster:
+    """
+    Sends notification events to the websocket group, optionally coalescing
+    them for a short window so that a burst of writes on the same object
+    results in a single latest-state event.
+    """
+
+    def __init__(self, group=NOTIFICATIONS_GROUP, window=None):
+        self.group = group
+        self._window = window
+        self._lock = threading.Lock()
+        self._pending = OrderedDict()
+        # Trace context of the latest publish merged into each pending event.
+        self._traces = {}
+        # A threading.Timer, or an asyncio TimerHandle on _timer_loop
+        self._timer = None
+        self._timer_loop = None
+        self._flush_task = None
+        self._started = self._stats_logged = time.monotonic()
+        self.published = 0
+        self.sent = 0
+
+    @property
+    def window(self):
+        if self._window is not None:
+            return self._window
+        return getattr(settings, 'NOTIFICATION_COALESCE_WINDOW', 0)
+
+    def publish(self, event_type, data):
+        if not self.window:
+            with self._lock:
+                self.published += 1
+            self._send([self._message(event_type, data)])
+        elif self._buffer(event_type, data):
+            self._schedule_flush()
+
+    async def apublish(self, event_type, data):
+        """publish() for async callers, awaiting the group send directly."""
+        if not self.window:
+            with self._lock:
+                self.published += 1
+            await self._asend([self._message(event_type, data)])
+        elif self._buffer(event_type, data):
+            self._schedule_on(asyncio.get_running_loop())
+
+    def _buffer(self, event_type, data):
+        """Merge an event into the pending ones; True if a flush must be scheduled."""
+        with self._lock:
+            self.published += 1
+            key = self._merge(event_type, data)
+            self._traces[key] = current_traceparent()
+            if self._timer is not None:
+                return False
+            self._timer = _SCHEDULING
+            return True
+
+    def _schedule_flush(self):
+        """
+        Flush on the event loop serving this thread, so the group send runs
+        where the channel layer lives (InMemoryChannelLayer cannot be used
+        from another loop). A thread with no such loop (WSGI, a shell) gets
+        the temporary loop of async_to_sync, which is closed on return;
+        then a timer thread flushes instead, which suits out-of-process
+        layers such as Redis.
+        """
+        async def schedule():
+            loop = asyncio.get_running_loop()
+            self._schedule_on(loop)
+            return loop
+
+        if async_to_sync(schedule)().is_closed():
+            timer = threading.Timer(self.window, self.flush)
+            timer.daemon = True
+            with self._lock:
+                self._timer, self._timer_loop = timer, None
+            timer.start()
+
+    def _schedule_on(self, loop):
+        def start_flush():
+            self._flush_task = loop.create_task(self.aflush())
+
+        handle = loop.call_later(self.window, start_flush)
+        with self._lock:
+            self._timer, self._timer_loop = handle, loop
+
+    def flush(self):
+        messages = self._take_pending()
+        if messages:
+            self._send(messages)
+
+    async def aflush(self):
+        messages = self._take_pending()
+        if messages:
+            await self._asend(messages)
+
+    def _take_pending(self):
+        with self._lock:
+            timer, loop = self._timer, self._timer_loop
+            self._timer = self._timer_loop = None
+            pending, self._pending = self._pending, OrderedDict()
+            traces, self._traces = self._traces, {}
+        if loop is not None:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(timer.cancel)
+        elif isinstance(timer, threading.Timer):
+            timer.cancel()
+        messages = [
+            self._message(*event, traceparent=traces.get(key))
+            for key, event in pending.items()
+        ]
+        if messages:
+            logger.debug('Flushing %d coalesced events', len(messages))
+        return messages
+
+    def stats(self):
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        return {
+            'published': self.published,
+            'sent': self.sent,
+            'pending': len(self._pending),
+            'coalesced': self.published - self.sent - len(self._pending),
+            'send_rate': self.sent / elapsed,
+        }
+
+    def _record_sent(self, count):
+        # Log stats() at most every NOTIFICATION_STATS_INTERVAL seconds, so
+        # the send rate and coalescing ratio show up in production logs.
+        interval = getattr(settings, 'NOTIFICATION_STATS_INTERVAL', 60)
+        with self._lock:
+            self.sent += count
+            now = time.monotonic()
+            due = interval is not None and now - self._stats_logged >= interval
+            if due:
+                self._stats_logged = now
+        if due:
+            logger.info('Notification stats %s', json.dumps(self.stats()))
+
+    def _merge(self, event_type, data):
+        if event_type == MEMBERSHIP_EVENT:
+            return self._merge_membership(data)
+
+        object_id = data.get('id') if isinstance(data, dict) else None
+        if object_id is None:
+            key = object()
+            self._pending[key] = (event_type, data)
+            return key
+
+        kind = event_type.split('_', 1)[0]
+        key = (kind, object_id)
+        previous = self._pending.get(key)
+        if previous and not event_type.endswith('_deleted'):
+            event_type, data = self._merge_update(previous, event_type, data)
+        self._pending[key] = (event_type, data)
+        return key
+
+    def _merge_update(self, previous, event_type, data):
+        """
+        Fold an update into the pending event of its object. Full payloads
+        replace the pending one; deltas (`changed` fields only) are applied
+        to a pending created payload or unioned with a pending delta.
+        """
+        previous_type, previous_data = previous
+        created = previous_type.endswith('_created')
+        changed = data.get('changed')
+        if isinstance(changed, dict):
+            if created:
+                version = data.get('version')
+                data = {**previous_data, **changed}
+                if version is not None:
+                    data['version'] = version
+            elif isinstance(previous_data.get('changed'), dict):
+                data = {**data, 'changed': {**previous_data['changed'], **changed}}
+        return (previous_type if created else event_type), data
+
+    def _merge_membership(self, data):
+        collection_id = data['collection_id']
+        key = ('membership', collection_id)
+        if key not in self._pending:
+            self._pending[key] = (MEMBERSHIP_EVENT, {
+                'collection_id': collection_id,
+                'added': [],
+                'removed': [],
+            })
+        delta = self._pending[key][1]
+        for change, opposite in (('added', 'removed'), ('removed', 'added')):
+            for post_id in data.get(change, []):
+                if post_id in delta[opposite]:
+                    delta[opposite].remove(post_id)
+                if post_id not in delta[change]:
+                    delta[change].append(post_id)
+        if 'version' in data:
+            delta['version'] = max(delta.get('version', 0), data['version'])
+        return key
+
+    def _message(self, event_type, data, traceparent=None):
+        message = {
+            'type': 'notification.message',
+            'message': {
+                'event_type': event_type,
+                'data': data,
+            }
+        }
+        if traceparent:
+            message['traceparent'] = traceparent
+        return message
+
+    @contextmanager
+    def _send_span(self, message):
+        # Consumers continue the trace from the group send, not the request.
+        parent = message.pop('traceparent', None)
+        with start_span('channel.group_send', parent=parent, group=self.group) as span:
+            if span is not None:
+                message['traceparent'] = span.traceparent
+            yield
+
+    def _send(self, messages):
+        channel_layer = get_channel_layer()
+        replay_buffer = get_replay_buffer()
+        for message in messages:
+            with self._send_span(message):
+                replay_buffer.append(message['message'])
+                async_to_sync(channel_layer.group_send)(self.group, message)
+        self._record_sent(len(messages))
+
+    async def _asend(self, messages):
+        channel_layer = get_channel_layer()
+        replay_buffer = get_replay_buffer()
+        for message in messages:
+            with self._send_span(message):
+                await replay_buffer.aappend(message['message'])
+                await channel_layer.group_send(self.group, message)
+        self._record_sent(len(messages))
+
+
+broadcaster = EventBroadcaster()
@@ -0,0 +1,113 @@
+"""
+Read-through cache of serialized posts. Entries are keyed by post id and
+version stamp, so every write (which bumps the stamp) makes the old entry
+unreachable instead of having to find and delete it.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+from .versioning import bump_version, get_version
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _cache():
+    return caches[getattr(settings, 'POST_CACHE', 'default')]
+
+
+def single_flight(cache, key, compute, timeout, lock_timeout=5, poll=0.01):
+    """
+    Return cache[key], computing and storing it on a miss. Concurrent misses
+    on one key share a single computation: threads of a process wait for
+    their leader, processes for whoever holds an add() lock in the cache.
+    Waiters give up after `lock_timeout` and compute the value themselves.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    with _inflight_lock:
+        done = _inflight.get(key)
+        leader = done is None
+        if leader:
+            done = _inflight[key] = threading.Event()
+    if not leader:
+        done.wait(lock_timeout)
+        value = cache.get(key)
+        if value is not None:
+            return value
+        return compute()
+
+    lock_key = f'{key}:lock'
+    locked = False
+    try:
+        deadline = time.monotonic() + lock_timeout
+        locked = cache.add(lock_key, 1, lock_timeout)
+        while not locked and time.monotonic() < deadline:
+            time.sleep(poll)
+            value = cache.get(key)
+            if value is not None:
+                return value
+            locked = cache.add(lock_key, 1, lock_timeout)
+        value = compute()
+        cache.set(key, value, timeout)
+        return value
+    finally:
+        if locked:
+            cache.delete(lock_key)
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        done.set()
+
+
+def cached_post_data(post_id, load):
+    """The serialized post `post_id`, from the cache or from `load()`."""
+    timeout = getattr(settings, 'POST_CACHE_TIMEOUT', 300)
+    if not timeout:
+        return load()
+    key = f'post-data:{post_id}:{get_version("post", post_id)}'
+    return single_flight(
+        _cache(), key, load, timeout,
+        lock_timeout=getattr(settings, 'POST_CACHE_LOCK_TIMEOUT', 5)
+    )
+
+
+def _bump_post(post_id):
+    bump_version('post', post_id)
+    bump_version('post', 'list')
+
+
+def post_changed(sender, instance, **kwargs):
+    # Connected to post_save and post_delete, so writes outside the API
+    # (admin, shell, commands, cascades) invalidate too. Bump again on
+    # commit: a read between the write and the commit may have cached the
+    # old row under the first new stamp. The pk is read now, as delete()
+    # clears it before the commit.
+    post_id = instance.pk
+    _bump_post(post_id)
+    transaction.on_commit(lambda: _bump_post(post_id))
+
+
+class CachedRetrieveMixin:
+    """
+    Serves retrieve from the read-through post cache. Sparse fieldset
+    requests bypass it, as cached entries hold every field.
+    """
+
+    def retrieve(self, request, *args, **kwargs):
+        if 'fields' in request.query_params or 'exclude' in request.query_params:
+            return super().retrieve(request, *args, **kwargs)
+        try:
+            # One key per post: '01' and '1' must share the version stamp
+            # that writes bump.
+            pk = int(kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except ValueError:
+            return super().retrieve(request, *args, **kwargs)
+        data = cached_post_data(pk, lambda: self.get_serializer(self.get_object()).data)
+        return Response(data)
@@ -0,0 +1,80 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from .versioning import get_version, version_timestamp
+
+
+class ConditionalGetMixin:
+    """
+    Answers list and retrieve requests with strong ETags and Last-Modified
+    headers derived from version stamps, so unchanged data costs a 304
+    without touching the database or the serializer.
+
+    Views set `version_kind` and bump get_version(kind, pk) and
+    get_version(kind, 'list') whenever they write.
+    """
+
+    version_kind = None
+
+    def list(self, request, *args, **kwargs):
+        version = get_version(self.version_kind, 'list')
+        digest = hashlib.md5(
+            f'{version}:{request.build_absolute_uri()}'.encode()
+        ).hexdigest()
+        etag = f'"{self.version_kind}-list-{digest}"'
+        return self._conditional_response(
+            request, etag, version,
+            lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            # '01' and '1' are the same object and must share the version
+            # stamp that writes bump.
+            pk = int(kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except ValueError:
+            return super().retrieve(request, *args, **kwargs)
+        version = get_version(self.version_kind, pk)
+        tag = f'{self.version_kind}-{pk}-{version}'
+        if request.query_params:
+            # ?fields= and friends change the body, so they are part of the
+            # representation the ETag (and the cached response) stands for.
+            tag += '-' + hashlib.md5(request.query_params.urlencode().encode()).hexdigest()
+        etag = f'"{tag}"'
+        return self._conditional_response(
+            request, etag, version,
+            lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs)
+        )
+
+    def _conditional_response(self, request, etag, version, render):
+        # Last-Modified has one second resolution, so it is only a valid
+        # validator once the second of the last write is over; otherwise a
+        # second write in the same second would be answered with a 304.
+        last_modified = int(version_timestamp(version))
+        if last_modified + 1 > time.time():
+            last_modified = None
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            cache = caches[getattr(settings, 'RESPONSE_CACHE', 'default')]
+            timeout = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 0)
+            cache_key = f'response:{etag}'
+            data = cache.get(cache_key) if timeout else None
+            if data is not None:
+                response = Response(data)
+            else:
+                response = render()
+                if timeout and response.status_code == 200:
+                    cache.set(cache_key, response.data, timeout)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
@@ -1,13 +1,28 @@
 import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 
+from content_platform.tracing import start_span
+
+from .replay import get_replay_buffer
+
+
 class NotificationConsumer(AsyncWebsocketConsumer):
+    replayed_through = 0
+
     async def connect(self):
         await self.channel_layer.group_add(
             'notifications',
             self.channel_name
         )
-        await self.accept()
+        # Clients that sent their token as a subprotocol expect it echoed.
+        await self.accept(subprotocol=self.scope.get('auth_subprotocol'))
+
+        resume_from = self._resume_from()
+        if resume_from is not None:
+            await self._replay(resume_from)
 
     async def disconnect(self, close_code):
         await self.channel_layer.group_discard(
@@ -17,4 +32,29 @@ class NotificationConsumer(AsyncWebsocketConsumer):
 
     async def notification_message(self, event):
         message = event['message']
-        await self.send(text_data=json.dumps(message)) 
\ No newline at end of file
+        if message.get('seq', 0) <= self.replayed_through:
+            return
+        with start_span('websocket.send', parent=event.get('traceparent'), seq=message.get('seq')):
+            await self.send(text_data=json.dumps(message))
+
+    async def _replay(self, resume_from):
+        replay_buffer = get_replay_buffer()
+        messages = await sync_to_async(replay_buffer.since)(resume_from)
+        if messages is None:
+            latest_seq = await sync_to_async(lambda: replay_buffer.last_seq)()
+            await self.send(text_data=json.dumps({
+                'event_type': 'resync_required',
+                'data': {'latest_seq': latest_seq}
+            }))
+            return
+        for message in messages:
+            await self.send(text_data=json.dumps(message))
+        if messages:
+            self.replayed_through = messages[-1]['seq']
+
+    def _resume_from(self):
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        try:
+            return int(query['resume_from'][0])
+        except (KeyError, IndexError, ValueError):
+            return None
@@ -0,0 +1,113 @@
+import csv
+import io
+import itertools
+import json
+import sys
+import zlib
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+from .models import Post
+
+POST_EXPORT_FIELDS = ['id', 'title', 'body', 'created_at', 'updated_at', 'author_id']
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def csv_lines(rows, fields):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({
+            key: json.dumps(value) if isinstance(value, list) else value
+            for key, value in row.items()
+        })
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def encode(lines, chunk_size=64 * 1024):
+    """Join small lines into roughly chunk_size byte chunks."""
+    chunk = []
+    size = 0
+    for line in lines:
+        data = line.encode()
+        chunk.append(data)
+        size += len(data)
+        if size >= chunk_size:
+            yield b''.join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield b''.join(chunk)
+
+
+def gzip_stream(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(rows, fields, output='ndjson', compress=False):
+    lines = csv_lines(rows, fields) if output == 'csv' else ndjson_lines(rows)
+    chunks = encode(lines)
+    return gzip_stream(chunks) if compress else chunks
+
+
+def post_rows(queryset=None, chunk_size=2000):
+    queryset = Post.objects.all() if queryset is None else queryset
+    return queryset.order_by('id').values(*POST_EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+
+
+async def async_chunks(chunks, batch=16):
+    """
+    Iterate `chunks` from async code, pulling `batch` chunks per
+    sync_to_async call. Thread-sensitive, so every pull runs on the thread
+    that opened the export's database cursor.
+    """
+    chunks = iter(chunks)
+    pull = sync_to_async(lambda: list(itertools.islice(chunks, batch)))
+    while True:
+        pulled = await pull()
+        if not pulled:
+            return
+        for chunk in pulled:
+            yield chunk
+
+
+def streaming_export_response(request, rows, fields, filename, output='ndjson', compress=False):
+    content_type = 'text/csv' if output == 'csv' else 'application/x-ndjson'
+    extension = 'csv' if output == 'csv' else 'ndjson'
+    chunks = export_stream(rows, fields, output, compress)
+    # Under ASGI, Django reads a sync iterator with sync_to_async(list),
+    # buffering the whole export in memory.
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        chunks = async_chunks(chunks)
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    if compress:
+        response['Content-Encoding'] = 'gzip'
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{extension}"'
+    return response
+
+
+def write_chunks(chunks, path=None):
+    if path:
+        with open(path, 'wb') as handle:
+            for chunk in chunks:
+                handle.write(chunk)
+    else:
+        for chunk in chunks:
+            sys.stdout.buffer.write(chunk)
+        sys.stdout.buffer.flush()
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.archive import archive_batch, archive_cutoff
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Move posts older than --days (default POST_ARCHIVE_AFTER_DAYS) to the '
+        'archive table in batches, keeping their ids and collection memberships. '
+        'Meant to run periodically, e.g. from cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help='Archive posts created more than this many days ago')
+        parser.add_argument('--batch-size', type=int,
+                            help='Posts moved per transaction (defaults to POST_ARCHIVE_BATCH_SIZE)')
+        parser.add_argument('--limit', type=int, help='Stop after archiving this many posts')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count the posts that would be archived')
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(options['days'])
+        if options['dry_run']:
+            count = Post.objects.filter(created_at__lt=cutoff).count()
+            self.stdout.write(f'{count} posts created before {cutoff:%Y-%m-%d} would be archived')
+            return
+
+        batch_size = options['batch_size'] or getattr(settings, 'POST_ARCHIVE_BATCH_SIZE', 1000)
+        limit = options['limit']
+        total = 0
+        while limit is None or total < limit:
+            size = batch_size if limit is None else min(batch_size, limit - total)
+            ids = archive_batch(cutoff, size)
+            if not ids:
+                break
+            total += len(ids)
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Archived {len(ids)} posts (up to id {max(ids)})')
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {total} posts created before {cutoff:%Y-%m-%d}'
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts.export import POST_EXPORT_FIELDS, export_stream, post_rows, write_chunks
+
+
+class Command(BaseCommand):
+    help = 'Stream every post to a file (or stdout) as NDJSON or CSV with constant memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', dest='output', choices=['ndjson', 'csv'], default='ndjson')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output with gzip')
+        parser.add_argument('--file', help='Output path (defaults to stdout)')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        chunks = export_stream(
+            post_rows(chunk_size=options['chunk_size']),
+            POST_EXPORT_FIELDS,
+            output=options['output'],
+            compress=options['gzip']
+        )
+        write_chunks(chunks, options['file'])
+
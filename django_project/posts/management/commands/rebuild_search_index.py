@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Create the full-text search index for posts and rebuild it from the posts table.'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        if backend is None:
+            raise CommandError(f'Full-text search is not supported on {connection.vendor}')
+        with connection.cursor() as cursor:
+            backend.install(cursor)
+            backend.rebuild(cursor)
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt'))
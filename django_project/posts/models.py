@@ -1,12 +1,55 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+EXCERPT_LENGTH = 280
+
 class Post(models.Model):
     title = models.CharField(max_length=200)
     body = models.TextField()
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    # Denormalized, maintained by content_collections.counters
+    collection_count = models.PositiveIntegerField(default=0, editable=False)
+
+    def __str__(self):
+        return self.title
+
+    def save(self, *args, **kwargs):
+        self.refresh_excerpt()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'body' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'excerpt'}
+        super().save(*args, **kwargs)
+
+    def refresh_excerpt(self):
+        body = ' '.join(self.body.split())
+        if len(body) > EXCERPT_LENGTH:
+            body = body[:EXCERPT_LENGTH - 1].rsplit(' ', 1)[0] + '\u2026'
+        self.excerpt = body
+
+    class Meta:
+        ordering = ['-created_at']
+        # Also drives posts.archive, which moves the oldest posts out.
+        indexes = [models.Index(fields=['created_at'])]
+
+class ArchivedPost(models.Model):
+    """
+    Cold tier for posts older than POST_ARCHIVE_AFTER_DAYS, moved here by
+    `manage.py archive_posts` with their ids. Read-only; fetch through
+    posts.archive, which also computes `collection_count`.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=200)
+    body = models.TextField()
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE, null=True, blank=True, related_name='archived_posts'
+    )
+    archived_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return self.title
@@ -0,0 +1,108 @@
+import threading
+from collections import deque
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+
+class ReplayBuffer:
+    """
+    Bounded in-memory ring buffer of sequenced notification messages.
+
+    Every appended message gets the next monotonically increasing sequence
+    number so reconnecting clients can ask for everything after the last
+    one they saw.
+    """
+
+    def __init__(self, size=None):
+        self.size = size or getattr(settings, 'NOTIFICATION_REPLAY_BUFFER_SIZE', 1000)
+        self._lock = threading.Lock()
+        self._events = deque(maxlen=self.size)
+        self._seq = 0
+
+    @property
+    def last_seq(self):
+        return self._seq
+
+    def append(self, message):
+        with self._lock:
+            self._seq += 1
+            message['seq'] = self._seq
+            self._events.append(message)
+            return self._seq
+
+    async def aappend(self, message):
+        # In memory only, so there is nothing to wait for.
+        return self.append(message)
+
+    def since(self, seq):
+        """
+        Return the messages sequenced after `seq`, or None when some of
+        them have already been evicted and the client has to resync. A
+        `seq` ahead of the buffer means the sequence restarted (e.g. on a
+        deploy) after the client saw it, which also needs a resync.
+        """
+        with self._lock:
+            if seq > self._seq:
+                return None
+            if seq == self._seq:
+                return []
+            if not self._events or self._events[0]['seq'] > seq + 1:
+                return None
+            return [message for message in self._events if message['seq'] > seq]
+
+
+class CacheReplayBuffer(ReplayBuffer):
+    """
+    Replay buffer persisted in a Django cache so that sequence numbers and
+    history are shared between processes and survive restarts.
+    """
+
+    key_prefix = 'notifications:replay'
+
+    def __init__(self, size=None, alias=None):
+        super().__init__(size)
+        self.cache = caches[alias or getattr(settings, 'NOTIFICATION_REPLAY_CACHE', 'default')]
+        self.timeout = getattr(settings, 'NOTIFICATION_REPLAY_TIMEOUT', 3600)
+
+    @property
+    def last_seq(self):
+        return self.cache.get(f'{self.key_prefix}:seq', 0)
+
+    def append(self, message):
+        seq_key = f'{self.key_prefix}:seq'
+        self.cache.add(seq_key, 0, timeout=None)
+        seq = self.cache.incr(seq_key)
+        message['seq'] = seq
+        self.cache.set(f'{self.key_prefix}:{seq}', message, timeout=self.timeout)
+        return seq
+
+    async def aappend(self, message):
+        return await sync_to_async(self.append)(message)
+
+    def since(self, seq):
+        last_seq = self.last_seq
+        if seq > last_seq:
+            return None
+        if seq == last_seq:
+            return []
+        if last_seq - seq > self.size:
+            return None
+        keys = [f'{self.key_prefix}:{n}' for n in range(seq + 1, last_seq + 1)]
+        found = self.cache.get_many(keys)
+        if len(found) != len(keys):
+            return None
+        return [found[key] for key in keys]
+
+
+_replay_buffer = None
+
+
+def get_replay_buffer():
+    global _replay_buffer
+    if _replay_buffer is None:
+        backend = getattr(settings, 'NOTIFICATION_REPLAY_BACKEND', 'posts.replay.ReplayBuffer')
+        _replay_buffer = import_string(backend)()
+    return _replay_buffer
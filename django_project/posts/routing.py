@@ -1,6 +1,10 @@
 from django.urls import re_path
-from . import consumers
+from . import consumers, sse
 
 websocket_urlpatterns = [
     re_path(r'ws/notifications/$', consumers.NotificationConsumer.as_asgi()),
-] 
\ No newline at end of file
+]
+
+http_urlpatterns = [
+    re_path(r'^sse/notifications/$', sse.NotificationStreamConsumer.as_asgi()),
+]
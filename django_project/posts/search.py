@@ -0,0 +1,167 @@
+import base64
+import json
+import re
+
+from django.db import connection, connections
+
+SNIPPET_START = '<mark>'
+SNIPPET_END = '</mark>'
+
+
+def _quote_terms(query):
+    # Treat user input as plain terms rather than FTS query syntax.
+    terms = re.findall(r'\w+', query)
+    return ' '.join('"%s"' % term for term in terms)
+
+
+def encode_cursor(score, post_id):
+    raw = json.dumps([score, post_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        score, post_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(score), int(post_id)
+    except (ValueError, TypeError):
+        return None
+
+
+class SQLiteSearchBackend:
+    """
+    FTS5 external-content index over posts_post kept in sync by triggers,
+    so it also covers bulk writes that bypass model signals.
+    """
+
+    table = 'posts_post_fts'
+
+    def exists(self, cursor):
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [self.table])
+        return cursor.fetchone() is not None
+
+    def install(self, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5("
+            "title, body, content='posts_post', content_rowid='id')"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS posts_post_fts_ai AFTER INSERT ON posts_post BEGIN "
+            f"INSERT INTO {self.table}(rowid, title, body) VALUES (new.id, new.title, new.body); END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS posts_post_fts_ad AFTER DELETE ON posts_post BEGIN "
+            f"INSERT INTO {self.table}({self.table}, rowid, title, body) "
+            f"VALUES ('delete', old.id, old.title, old.body); END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS posts_post_fts_au AFTER UPDATE OF title, body ON posts_post BEGIN "
+            f"INSERT INTO {self.table}({self.table}, rowid, title, body) "
+            f"VALUES ('delete', old.id, old.title, old.body); "
+            f"INSERT INTO {self.table}(rowid, title, body) VALUES (new.id, new.title, new.body); END"
+        )
+
+    def rebuild(self, cursor):
+        cursor.execute(f"INSERT INTO {self.table}({self.table}) VALUES ('rebuild')")
+
+    def search(self, cursor, query, after, limit):
+        # bm25() is lower for better matches, so ascending order ranks best first.
+        sql = (
+            "SELECT id, score, snippet FROM ("
+            f"SELECT rowid AS id, bm25({self.table}) AS score, "
+            f"snippet({self.table}, -1, %s, %s, '...', 16) AS snippet "
+            f"FROM {self.table} WHERE {self.table} MATCH %s) "
+        )
+        params = [SNIPPET_START, SNIPPET_END, query]
+        if after:
+            sql += "WHERE score > %s OR (score = %s AND id > %s) "
+            params += [after[0], after[0], after[1]]
+        sql += "ORDER BY score, id LIMIT %s"
+        cursor.execute(sql, params + [limit])
+        return cursor.fetchall()
+
+
+class PostgresSearchBackend:
+    """
+    Expression GIN index over to_tsvector(title || body); the index is kept
+    up to date by Postgres itself on every write.
+    """
+
+    document = "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(body, ''))"
+
+    def exists(self, cursor):
+        cursor.execute("SELECT 1 FROM pg_indexes WHERE indexname = 'posts_post_search_idx'")
+        return cursor.fetchone() is not None
+
+    def install(self, cursor):
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS posts_post_search_idx ON posts_post USING GIN (({self.document}))"
+        )
+
+    def rebuild(self, cursor):
+        # The expression index is populated when it is created.
+        pass
+
+    def search(self, cursor, query, after, limit):
+        # ts_rank is higher for better matches; negate it so that both
+        # backends order and paginate on an ascending score. It returns a
+        # float4, which never equals the float8 cursor parameter, so the
+        # tie-break on id only works once the score is a float8 as well.
+        sql = (
+            "SELECT id, score, snippet FROM ("
+            f"SELECT id, -ts_rank({self.document}, q)::float8 AS score, "
+            "ts_headline('english', body, q, %s) AS snippet "
+            f"FROM posts_post, websearch_to_tsquery('english', %s) q WHERE {self.document} @@ q) ranked "
+        )
+        options = f'StartSel={SNIPPET_START}, StopSel={SNIPPET_END}, MaxWords=16, MinWords=8'
+        params = [options, query]
+        if after:
+            sql += "WHERE score > %s OR (score = %s AND id > %s) "
+            params += [after[0], after[0], after[1]]
+        sql += "ORDER BY score, id LIMIT %s"
+        cursor.execute(sql, params + [limit])
+        return cursor.fetchall()
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend(using=None):
+    vendor = (using or connection).vendor
+    backend = BACKENDS.get(vendor)
+    return backend() if backend else None
+
+
+def install_search_index(sender, using='default', **kwargs):
+    conn = connections[using]
+    backend = get_search_backend(conn)
+    if backend is None:
+        return
+    with conn.cursor() as cursor:
+        if not backend.exists(cursor):
+            backend.install(cursor)
+            backend.rebuild(cursor)
+
+
+def search_posts(query, cursor=None, limit=20):
+    """
+    Return (rows, next_cursor) where rows are (post_id, score, snippet)
+    ordered by relevance.
+    """
+    backend = get_search_backend()
+    if backend is None:
+        raise NotImplementedError(f'Full-text search is not supported on {connection.vendor}')
+    if connection.vendor == 'sqlite':
+        query = _quote_terms(query)
+    if not query.strip():
+        return [], None
+    after = decode_cursor(cursor) if cursor else None
+    with connection.cursor() as db_cursor:
+        rows = backend.search(db_cursor, query, after, limit + 1)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+    return rows, next_cursor
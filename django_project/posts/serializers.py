@@ -1,8 +1,77 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
+from content_platform.fieldsets import SparseFieldsetSerializerMixin
 from .models import Post
 
-class PostSerializer(serializers.ModelSerializer):
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+class PostListSerializer(serializers.ListSerializer):
+    """
+    Writes many posts with bulk_create/bulk_update, one transaction per
+    chunk of BULK_CHUNK_SIZE rows, instead of one INSERT/UPDATE per post.
+    """
+
+    def create(self, validated_data):
+        chunk_size = getattr(settings, 'BULK_CHUNK_SIZE', 1000)
+        posts = [Post(**attrs) for attrs in validated_data]
+        for post in posts:
+            post.refresh_excerpt()
+        for chunk in chunked(posts, chunk_size):
+            with transaction.atomic():
+                Post.objects.bulk_create(chunk)
+        return posts
+
+    def update(self, instance, validated_data):
+        chunk_size = getattr(settings, 'BULK_CHUNK_SIZE', 1000)
+        now = timezone.now()
+        fields = {'updated_at'}
+        for post, attrs in zip(instance, validated_data):
+            for attr, value in attrs.items():
+                setattr(post, attr, value)
+                fields.add(attr)
+            if 'body' in attrs:
+                post.refresh_excerpt()
+                fields.add('excerpt')
+            post.updated_at = now
+        for chunk in chunked(instance, chunk_size):
+            with transaction.atomic():
+                Post.objects.bulk_update(chunk, sorted(fields))
+        return instance
+
+class CachedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves each related pk once per serializer context, so validating a
+    bulk payload does not look up the same author for every item.
+    """
+
+    def to_internal_value(self, data):
+        # Keyed by type too, so True does not hit the entry of 1.
+        key = (type(data), data)
+        try:
+            hash(key)
+        except TypeError:
+            # Lists, dicts: let the field reject them as usual.
+            return super().to_internal_value(data)
+        cache = self.context.setdefault(f'_{self.field_name}_cache', {})
+        if key not in cache:
+            cache[key] = super().to_internal_value(data)
+        return cache[key]
+
+class PostSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    author = CachedPrimaryKeyRelatedField(
+        queryset=User.objects.all(), allow_null=True, required=False
+    )
+
     class Meta:
         model = Post
-        fields = ['id', 'title', 'body', 'created_at', 'updated_at', 'author']
-        read_only_fields = ['created_at', 'updated_at'] 
\ No newline at end of file
+        fields = [
+            'id', 'title', 'body', 'excerpt', 'collection_count',
+            'created_at', 'updated_at', 'author'
+        ]
+        read_only_fields = ['excerpt', 'collection_count', 'created_at', 'updated_at']
+        list_serializer_class = PostListSerializer
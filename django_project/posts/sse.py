@@ -0,0 +1,97 @@
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from channels.generic.http import AsyncHttpConsumer
+from django.conf import settings
+
+from .replay import get_replay_buffer
+
+
+class NotificationStreamConsumer(AsyncHttpConsumer):
+    """
+    Server-Sent Events flavour of NotificationConsumer for clients that only
+    need the one-way stream. It reads from the same channel-layer group and
+    resumes from the standard Last-Event-ID header.
+    """
+
+    heartbeat_task = None
+    replayed_through = 0
+
+    async def http_request(self, message):
+        # Unlike the base class, keep the consumer alive once the headers are
+        # out; the response only ends when the client disconnects.
+        if 'body' in message:
+            self.body.append(message['body'])
+        if not message.get('more_body'):
+            await self.handle(b''.join(self.body))
+
+    async def handle(self, body):
+        await self.send_headers(headers=[
+            (b'Content-Type', b'text/event-stream'),
+            (b'Cache-Control', b'no-cache'),
+            (b'X-Accel-Buffering', b'no'),
+        ])
+        retry = getattr(settings, 'NOTIFICATION_SSE_RETRY', 3000)
+        await self.send_body(f'retry: {retry}\n\n'.encode(), more_body=True)
+
+        await self.channel_layer.group_add('notifications', self.channel_name)
+
+        last_event_id = self._last_event_id()
+        if last_event_id is not None:
+            await self._replay(last_event_id)
+
+        self.heartbeat_task = asyncio.ensure_future(self._heartbeat())
+
+    async def disconnect(self):
+        if self.heartbeat_task is not None:
+            self.heartbeat_task.cancel()
+        await self.channel_layer.group_discard('notifications', self.channel_name)
+
+    async def notification_message(self, event):
+        message = event['message']
+        if message.get('seq', 0) <= self.replayed_through:
+            return
+        await self._send_event(message)
+
+    async def _replay(self, last_event_id):
+        replay_buffer = get_replay_buffer()
+        messages = await sync_to_async(replay_buffer.since)(last_event_id)
+        if messages is None:
+            latest_seq = await sync_to_async(lambda: replay_buffer.last_seq)()
+            await self._send_event({
+                'event_type': 'resync_required',
+                'data': {'latest_seq': latest_seq}
+            })
+            return
+        for message in messages:
+            await self._send_event(message)
+        if messages:
+            self.replayed_through = messages[-1]['seq']
+
+    async def _heartbeat(self):
+        interval = getattr(settings, 'NOTIFICATION_SSE_HEARTBEAT', 15)
+        while True:
+            await asyncio.sleep(interval)
+            await self.send_body(b': heartbeat\n\n', more_body=True)
+
+    async def _send_event(self, message):
+        lines = []
+        if 'seq' in message:
+            lines.append(f"id: {message['seq']}")
+        lines.append(f"data: {json.dumps(message)}")
+        await self.send_body(('\n'.join(lines) + '\n\n').encode(), more_body=True)
+
+    def _last_event_id(self):
+        headers = dict(self.scope.get('headers', []))
+        value = headers.get(b'last-event-id')
+        if value is None:
+            # EventSource cannot set headers on the first connect, so allow
+            # the id to be passed in the query string as well.
+            query = parse_qs(self.scope.get('query_string', b'').decode())
+            value = query.get('last_event_id', [None])[0]
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
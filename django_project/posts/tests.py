@@ -1,10 +1,40 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 from django.urls import reverse
+from django.utils import timezone
+from jose import jwt
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import Post
+from content_platform.authentication import TokenAuthMiddleware
+from content_platform.testing import QueryBudgetMixin
+from .broadcast import EventBroadcaster, broadcaster
+from .cache import single_flight
+from .consumers import NotificationConsumer
+from .models import ArchivedPost, Post
+from .replay import CacheReplayBuffer, ReplayBuffer
+from .routing import websocket_urlpatterns
 from .serializers import PostSerializer
+from .sse import NotificationStreamConsumer
+from .versioning import get_version
 
 class PostModelTest(TestCase):
     def setUp(self):
@@ -32,7 +62,7 @@ class PostModelTest(TestCase):
         )
         self.assertEqual(str(post), 'Test Post')
 
-class PostAPITest(APITestCase):
+class PostAPITest(QueryBudgetMixin, APITestCase):
     def setUp(self):
         self.user = User.objects.create_user(
             username='testuser',
@@ -47,7 +77,8 @@ class PostAPITest(APITestCase):
             'title': 'New Post',
             'body': 'This is a new post'
         }
-        response = self.client.post(url, data, format='json')
+        with self.assertQueryBudget(3):
+            response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Post.objects.count(), 1)
         self.assertEqual(Post.objects.get().title, 'New Post')
@@ -65,7 +96,8 @@ class PostAPITest(APITestCase):
         )
         
         url = reverse('post-list')
-        response = self.client.get(url)
+        with self.assertQueryBudget(2):
+            response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 2)
         
@@ -76,7 +108,8 @@ class PostAPITest(APITestCase):
             author=self.user
         )
         url = reverse('post-detail', args=[post.id])
-        response = self.client.get(url)
+        with self.assertQueryBudget(1):
+            response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['title'], 'Test Post')
         
@@ -91,7 +124,8 @@ class PostAPITest(APITestCase):
             'title': 'Updated Title',
             'body': 'Updated Body'
         }
-        response = self.client.put(url, data, format='json')
+        with self.assertQueryBudget(4):
+            response = self.client.put(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         post.refresh_from_db()
         self.assertEqual(post.title, 'Updated Title')
@@ -103,10 +137,515 @@ class PostAPITest(APITestCase):
             author=self.user
         )
         url = reverse('post-detail', args=[post.id])
-        response = self.client.delete(url)
+        with self.assertQueryBudget(6):
+            response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(Post.objects.count(), 0)
 
+    def test_create_rejects_malformed_author(self):
+        url = reverse('post-list')
+        for author in ([self.user.id], {'id': self.user.id}, True):
+            response = self.client.post(
+                url, {'title': 'T', 'body': 'B', 'author': author}, format='json'
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('author', response.data)
+
+class AsyncPostAPITest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_login(self.user)
+
+    def test_list_matches_sync_api(self):
+        for n in range(12):
+            Post.objects.create(title=f'Post {n}', body='Body', author=self.user)
+        for page in (1, 2):
+            sync = self.client.get(reverse('post-list'), {'page': page}).json()
+            response = self.client.get(reverse('async-post-list'), {'page': page})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            data = response.json()
+            self.assertEqual(data['results'], sync['results'])
+            self.assertEqual(data['count'], 12)
+            self.assertEqual(data['next'] is None, sync['next'] is None)
+        response = self.client.get(reverse('async-post-list'), {'page': 3})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_create_and_retrieve(self):
+        with mock.patch.object(broadcaster, 'apublish', new_callable=mock.AsyncMock) as apublish:
+            response = self.client.post(
+                reverse('async-post-list'),
+                {'title': 'New Post', 'body': 'Body', 'author': self.user.id},
+                content_type='application/json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        post = Post.objects.get()
+        self.assertEqual(post.author, self.user)
+        self.assertEqual(apublish.call_args[0][0], 'post_created')
+
+        response = self.client.get(reverse('async-post-detail', args=[post.id]))
+        self.assertEqual(response.json()['title'], 'New Post')
+        response = self.client.get(reverse('async-post-detail', args=[post.id + 1]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_create_validates_input(self):
+        url = reverse('async-post-list')
+        response = self.client.post(url, {'body': 'Body'}, content_type='application/json')
+        self.assertIn('title', response.json())
+        response = self.client.post(
+            url, {'title': 'T', 'body': 'B', 'author': 999}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(
+            url, {'title': 'T', 'body': 'B', 'author': True}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Post.objects.exists())
+
+class PostConditionalGetTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.post = Post.objects.create(
+            title='Test Post',
+            body='Test Body',
+            author=self.user
+        )
+
+    def test_retrieve_returns_not_modified_for_matching_etag(self):
+        url = reverse('post-detail', args=[self.post.id])
+        response = self.client.get(url)
+        etag = response['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_update_changes_etag(self):
+        url = reverse('post-detail', args=[self.post.id])
+        etag = self.client.get(url)['ETag']
+        list_etag = self.client.get(reverse('post-list'))['ETag']
+        self.client.put(url, {'title': 'New', 'body': 'New'}, format='json')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['title'], 'New')
+        response = self.client.get(reverse('post-list'), HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_padded_pk_shares_version_stamp(self):
+        url = reverse('post-detail', args=[self.post.id])
+        padded = url.replace(f'/{self.post.id}/', f'/0{self.post.id}/')
+        etag = self.client.get(padded)['ETag']
+        self.client.patch(url, {'title': 'New'}, format='json')
+        response = self.client.get(padded, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['title'], 'New')
+
+    def test_list_returns_not_modified_for_matching_etag(self):
+        url = reverse('post-list')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=60)
+    def test_sparse_and_full_retrieve_have_distinct_etags(self):
+        url = reverse('post-detail', args=[self.post.id])
+        full = self.client.get(url)
+        sparse = self.client.get(url, {'fields': 'id'}, HTTP_IF_NONE_MATCH=full['ETag'])
+        self.assertEqual(sparse.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(sparse.data), {'id'})
+        self.assertNotEqual(sparse['ETag'], full['ETag'])
+        self.assertIn('body', self.client.get(url).data)
+        response = self.client.get(url, {'fields': 'id'}, HTTP_IF_NONE_MATCH=sparse['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=60)
+    def test_response_cache_skips_database(self):
+        url = reverse('post-detail', args=[self.post.id])
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['title'], 'Test Post')
+
+class PostCacheTest(APITestCase):
+    def setUp(self):
+        caches['posts'].clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.post = Post.objects.create(title='Cached', body='Body', author=self.user)
+        self.url = reverse('post-detail', args=[self.post.id])
+
+    def test_retrieve_is_served_from_cache(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second.data['title'], 'Cached')
+
+    def test_writes_invalidate_cached_post(self):
+        self.client.get(self.url)
+        self.client.patch(self.url, {'title': 'Through the API'}, format='json')
+        self.assertEqual(self.client.get(self.url).data['title'], 'Through the API')
+
+        self.post.title = 'Through the ORM'
+        self.post.save()
+        self.assertEqual(self.client.get(self.url).data['title'], 'Through the ORM')
+
+        self.client.delete(self.url)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_orm_deletes_invalidate_cached_post(self):
+        self.client.get(self.url)
+        Post.objects.filter(pk=self.post.pk).delete()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+
+        post = Post.objects.create(title='Cascaded', body='Body', author=self.user)
+        url = reverse('post-detail', args=[post.id])
+        self.client.get(url)
+        self.user.delete()
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_writes_bump_list_stamp_on_commit(self):
+        for write in (
+            lambda: Post.objects.create(title='New', body='Body'),
+            lambda: self.post.save(),
+            lambda: self.post.delete(),
+        ):
+            before = get_version('post', 'list')
+            with self.captureOnCommitCallbacks(execute=True):
+                write()
+            self.assertNotEqual(get_version('post', 'list'), before)
+
+        post = Post.objects.create(title='Doomed', body='Body')
+        post_id = post.id
+        with self.captureOnCommitCallbacks() as callbacks:
+            post.delete()
+        stamp = get_version('post', post_id)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_version('post', post_id), stamp)
+
+    def test_cache_key_ignores_leading_zeros(self):
+        self.client.get(f'/api/posts/0{self.post.id}/')
+        self.post.title = 'Renamed'
+        self.post.save()
+        self.assertEqual(self.client.get(f'/api/posts/0{self.post.id}/').data['title'], 'Renamed')
+
+    def test_sparse_fieldsets_bypass_cache(self):
+        self.assertEqual(set(self.client.get(self.url, {'fields': 'id'}).data), {'id'})
+        self.assertIn('body', self.client.get(self.url).data)
+
+    @override_settings(POST_CACHE_TIMEOUT=0)
+    def test_disabled_cache_queries_every_time(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+    def test_single_flight_computes_once_per_key(self):
+        calls = []
+        barrier = threading.Barrier(8)
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return {'id': 1}
+
+        def read():
+            barrier.wait()
+            results.append(single_flight(caches['posts'], 'single-flight', compute, 60))
+
+        results = []
+        threads = [threading.Thread(target=read) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'id': 1}] * 8)
+
+    def test_single_flight_waits_for_lock_held_elsewhere(self):
+        backend = caches['posts']
+        backend.add('elsewhere:lock', 1, 60)
+        threading.Timer(0.05, backend.set, args=('elsewhere', 'computed', 60)).start()
+        compute = mock.Mock(return_value='recomputed')
+        self.assertEqual(single_flight(backend, 'elsewhere', compute, 60), 'computed')
+        compute.assert_not_called()
+
+
+class PostArchiveTest(APITestCase):
+    def setUp(self):
+        caches['posts'].clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.old = [
+            Post.objects.create(title=f'Old {n}', body='Old body', author=self.user)
+            for n in range(3)
+        ]
+        self.created_at = timezone.now() - timedelta(days=400)
+        Post.objects.filter(pk__in=[post.pk for post in self.old]).update(created_at=self.created_at)
+        self.recent = Post.objects.create(title='Recent', body='Body', author=self.user)
+
+    def test_archive_posts_moves_old_posts_in_batches(self):
+        output = io.StringIO()
+        call_command('archive_posts', days=365, batch_size=2, stdout=output)
+        self.assertIn('Archived 3 posts', output.getvalue())
+        self.assertEqual(list(Post.objects.values_list('id', flat=True)), [self.recent.id])
+        archived = ArchivedPost.objects.get(pk=self.old[0].pk)
+        self.assertEqual(archived.title, 'Old 0')
+        self.assertEqual(archived.created_at, self.created_at)
+        self.assertEqual(archived.author, self.user)
+
+    def test_archive_posts_dry_run_and_limit(self):
+        output = io.StringIO()
+        call_command('archive_posts', days=365, dry_run=True, stdout=output)
+        self.assertIn('3 posts', output.getvalue())
+        self.assertEqual(ArchivedPost.objects.count(), 0)
+        call_command('archive_posts', days=365, batch_size=5, limit=2, stdout=io.StringIO())
+        self.assertEqual(ArchivedPost.objects.count(), 2)
+
+    def test_archived_posts_stay_readable_by_id(self):
+        url = reverse('post-detail', args=[self.old[0].pk])
+        before = self.client.get(url).data
+        call_command('archive_posts', days=365, stdout=io.StringIO())
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, before)
+        self.assertEqual(self.client.get(url, {'fields': 'id,title'}).data['title'], 'Old 0')
+        self.assertEqual(
+            self.client.get(reverse('async-post-detail', args=[self.old[0].pk])).json()['title'],
+            'Old 0'
+        )
+        self.assertEqual(
+            [post['id'] for post in self.client.get(reverse('post-list')).data['results']],
+            [self.recent.id]
+        )
+        response = self.client.patch(url, {'title': 'Changed'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class PostSearchAPITest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_search_ranks_matches_with_snippets(self):
+        Post.objects.create(title='Django channels', body='Realtime websockets in Django', author=self.user)
+        Post.objects.create(title='Cooking', body='Pasta recipes', author=self.user)
+        response = self.client.get(reverse('post-search'), {'q': 'django'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIn('<mark>Django</mark>', response.data['results'][0]['snippet'])
+
+    def test_search_index_follows_updates_and_deletes(self):
+        post = Post.objects.create(title='Draft', body='Nothing yet', author=self.user)
+        post.body = 'Now about kubernetes'
+        post.save()
+        response = self.client.get(reverse('post-search'), {'q': 'kubernetes'})
+        self.assertEqual(len(response.data['results']), 1)
+        post.delete()
+        response = self.client.get(reverse('post-search'), {'q': 'kubernetes'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_search_paginates_by_cursor(self):
+        for n in range(5):
+            Post.objects.create(title=f'Python {n}', body='python tips', author=self.user)
+        response = self.client.get(reverse('post-search'), {'q': 'python', 'page_size': 3})
+        self.assertEqual(len(response.data['results']), 3)
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNone(response.data['next'])
+
+    @skipUnless(connection.vendor == 'postgresql', 'ts_rank float4 scores are Postgres only')
+    def test_search_pages_through_tied_scores(self):
+        posts = [
+            Post.objects.create(title=f'Python {n}', body='python tips', author=self.user)
+            for n in range(3)
+        ]
+        seen = []
+        response = self.client.get(reverse('post-search'), {'q': 'python', 'page_size': 1})
+        while True:
+            seen += [result['id'] for result in response.data['results']]
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(seen, [post.id for post in posts])
+
+    def test_search_clamps_page_size(self):
+        for n in range(2):
+            Post.objects.create(title=f'Python {n}', body='python tips', author=self.user)
+        for page_size in (0, -1):
+            response = self.client.get(reverse('post-search'), {'q': 'python', 'page_size': page_size})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.data['results']), 1)
+            self.assertIsNotNone(response.data['next'])
+
+    def test_search_requires_query(self):
+        response = self.client.get(reverse('post-search'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class PostBulkAPITest(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('post-bulk')
+
+    def test_bulk_create(self):
+        data = [{'title': f'Post {n}', 'body': 'Body'} for n in range(5)]
+        with mock.patch('posts.views.broadcaster') as broadcaster, self.assertQueryBudget(3):
+            response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 5)
+        self.assertEqual(Post.objects.count(), 5)
+        broadcaster.publish.assert_called_once_with(
+            'posts_bulk_created', {'ids': response.data['ids']}
+        )
+
+    def test_bulk_create_reports_item_errors(self):
+        data = [{'title': 'Valid', 'body': 'Body'}, {'body': 'Missing title'}]
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['errors'][0]['index'], 1)
+        self.assertIn('title', response.data['errors'][0]['errors'])
+        self.assertEqual(Post.objects.count(), 0)
+
+    def test_bulk_update(self):
+        posts = [Post.objects.create(title=f'Post {n}', body='Body') for n in range(3)]
+        data = [{'id': post.id, 'title': 'Renamed'} for post in posts]
+        data.append({'id': 999, 'title': 'Missing'})
+        response = self.client.patch(self.url, data, format='json')
+        self.assertEqual(response.data['errors'], [
+            {'index': 3, 'errors': {'id': ['Post not found.']}}
+        ])
+        with self.assertQueryBudget(4):
+            response = self.client.patch(self.url, data[:3], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Post.objects.filter(title='Renamed').count(), 3)
+
+    def test_bulk_update_rejects_bool_and_duplicate_ids(self):
+        post = Post.objects.create(title='Post', body='Body')
+        data = [{'id': True, 'title': 'A'}, {'id': post.id, 'title': 'B'}, {'id': post.id, 'title': 'C'}]
+        response = self.client.put(self.url, data, format='json')
+        self.assertEqual(response.data['errors'], [
+            {'index': 0, 'errors': {'id': ['This field is required.']}},
+            {'index': 2, 'errors': {'id': ['Duplicate id.']}},
+        ])
+        post.refresh_from_db()
+        self.assertEqual(post.title, 'Post')
+
+    def test_bulk_delete(self):
+        posts = [Post.objects.create(title=f'Post {n}', body='Body') for n in range(3)]
+        ids = [post.id for post in posts[:2]] + [999]
+        with self.assertQueryBudget(7):
+            response = self.client.delete(self.url, {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['deleted'], 2)
+        self.assertEqual(response.data['not_found'], [999])
+        self.assertEqual(Post.objects.count(), 1)
+
+        response = self.client.delete(self.url, [True], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.delete(self.url, [posts[2].id, posts[2].id], format='json')
+        self.assertEqual(response.data, {'deleted': 1, 'not_found': []})
+
+class PostSparseFieldsetTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.post = Post.objects.create(
+            title='Test Post',
+            body='word ' * 200,
+            author=self.user
+        )
+
+    def test_fields_narrows_response_and_defers_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('post-list'), {'fields': 'id,title,excerpt'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title', 'excerpt'})
+        self.assertNotIn('"body"', queries.captured_queries[-1]['sql'])
+
+    def test_exclude_drops_fields(self):
+        url = reverse('post-detail', args=[self.post.id])
+        response = self.client.get(url, {'exclude': 'body'})
+        self.assertNotIn('body', response.data)
+        self.assertIn('title', response.data)
+
+    def test_writes_ignore_fields(self):
+        response = self.client.post(
+            reverse('post-list') + '?fields=title', {'title': 'New', 'body': 'Kept'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Post.objects.get(pk=response.data['id']).body, 'Kept')
+
+    def test_excerpt_is_precomputed(self):
+        self.assertLessEqual(len(self.post.excerpt), 280)
+        self.assertTrue(self.post.excerpt.startswith('word word'))
+
+class PostExportTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        for n in range(3):
+            Post.objects.create(title=f'Post {n}', body='Body, with "quotes"', author=self.user)
+
+    def test_export_ndjson(self):
+        response = self.client.get(reverse('post-export'))
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['title'] for line in lines], ['Post 0', 'Post 1', 'Post 2'])
+
+    def test_export_gzipped_csv(self):
+        response = self.client.get(reverse('post-export'), {'output': 'csv', 'compress': 'gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        content = gzip.decompress(b''.join(response.streaming_content)).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['body'], 'Body, with "quotes"')
+
+    async def test_asgi_export_streams_asynchronously(self):
+        client = AsyncClient()
+        await sync_to_async(client.force_login)(self.user)
+        response = await client.get(reverse('post-export'))
+        self.assertTrue(response.is_async)
+        lines = b''.join([chunk async for chunk in response.streaming_content]).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+
+    def test_export_posts_command(self):
+        with tempfile.NamedTemporaryFile(suffix='.ndjson') as output:
+            call_command('export_posts', file=output.name)
+            lines = output.read().decode().splitlines()
+        self.assertEqual(len(lines), 3)
+
 class PostSerializerTest(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(
@@ -125,4 +664,209 @@ class PostSerializerTest(TestCase):
         data = serializer.data
         self.assertEqual(data['title'], 'Test Post')
         self.assertEqual(data['body'], 'Test Body')
-        self.assertEqual(data['author'], self.user.id) 
\ No newline at end of file
+        self.assertEqual(data['author'], self.user.id) 
+
+class EventBroadcasterTest(TestCase):
+    def test_publish_without_window_sends_immediately(self):
+        broadcaster = EventBroadcaster(window=0)
+        with mock.patch.object(broadcaster, '_send') as send:
+            broadcaster.publish('post_created', {'id': 1, 'title': 'A'})
+            broadcaster.publish('post_updated', {'id': 1, 'title': 'B'})
+        self.assertEqual(send.call_count, 2)
+
+    @override_settings(NOTIFICATION_STATS_INTERVAL=0)
+    def test_logs_stats(self):
+        broadcaster = EventBroadcaster(window=0)
+        with mock.patch('posts.broadcast.async_to_sync'), \
+                self.assertLogs('posts.broadcast', 'INFO') as logs:
+            broadcaster.publish('post_created', {'id': 1})
+        self.assertIn('"sent": 1', logs.output[-1])
+
+    def test_coalesces_events_per_object(self):
+        broadcaster = EventBroadcaster(window=60)
+        with mock.patch.object(broadcaster, '_send') as send:
+            broadcaster.publish('post_created', {'id': 1, 'title': 'A'})
+            broadcaster.publish('post_updated', {'id': 1, 'title': 'B'})
+            broadcaster.publish('post_updated', {'id': 2, 'title': 'C'})
+            broadcaster.flush()
+        messages = send.call_args[0][0]
+        self.assertEqual(len(messages), 2)
+        self.assertEqual(messages[0]['message']['event_type'], 'post_created')
+        self.assertEqual(messages[0]['message']['data']['title'], 'B')
+        self.assertEqual(broadcaster.stats()['published'], 3)
+
+    def test_coalesces_field_deltas(self):
+        broadcaster = EventBroadcaster(window=60)
+        with mock.patch.object(broadcaster, '_send') as send:
+            broadcaster.publish('collection_created', {'id': 1, 'name': 'A', 'owner': 'ann', 'version': 1})
+            broadcaster.publish('collection_updated', {'id': 1, 'changed': {'name': 'B'}, 'version': 2})
+            broadcaster.publish('collection_updated', {'id': 2, 'changed': {'name': 'C'}, 'version': 1})
+            broadcaster.publish('collection_updated', {'id': 2, 'changed': {'description': 'D'}, 'version': 2})
+            broadcaster.flush()
+        created, updated = [message['message'] for message in send.call_args[0][0]]
+        self.assertEqual(created, {
+            'event_type': 'collection_created',
+            'data': {'id': 1, 'name': 'B', 'owner': 'ann', 'version': 2}
+        })
+        self.assertEqual(updated, {
+            'event_type': 'collection_updated',
+            'data': {'id': 2, 'changed': {'name': 'C', 'description': 'D'}, 'version': 2}
+        })
+
+    def test_coalesces_membership_changes_into_delta(self):
+        broadcaster = EventBroadcaster(window=60)
+        with mock.patch.object(broadcaster, '_send') as send:
+            for post_id in range(1, 4):
+                broadcaster.publish('collection_posts_changed', {
+                    'collection_id': 7,
+                    'added': [post_id],
+                    'version': post_id
+                })
+            broadcaster.publish('collection_posts_changed', {
+                'collection_id': 7,
+                'removed': [2],
+                'version': 4
+            })
+            broadcaster.flush()
+        messages = send.call_args[0][0]
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(messages[0]['message'], {
+            'event_type': 'collection_posts_changed',
+            'data': {'collection_id': 7, 'added': [1, 3], 'removed': [2], 'version': 4}
+        })
+
+class ReplayBufferTest(TestCase):
+    def test_sequences_and_replays_events(self):
+        buffer = ReplayBuffer(size=3)
+        for n in range(5):
+            buffer.append({'event_type': 'post_updated', 'data': {'id': n}})
+        self.assertEqual(buffer.last_seq, 5)
+        self.assertEqual([m['seq'] for m in buffer.since(3)], [4, 5])
+        self.assertEqual(buffer.since(5), [])
+        self.assertIsNone(buffer.since(1))
+
+    def test_resume_from_before_a_restart_requires_resync(self):
+        buffer = ReplayBuffer(size=10)
+        buffer.append({'event_type': 'post_created', 'data': {'id': 1}})
+        self.assertIsNone(buffer.since(5000))
+        caches['default'].delete(f'{CacheReplayBuffer.key_prefix}:seq')
+        self.assertIsNone(CacheReplayBuffer(size=10).since(5000))
+
+    def test_cache_buffer_replays_events(self):
+        buffer = CacheReplayBuffer(size=10)
+        first = buffer.append({'event_type': 'post_created', 'data': {'id': 1}})
+        buffer.append({'event_type': 'post_deleted', 'data': {'id': 1}})
+        self.assertEqual(
+            [m['event_type'] for m in buffer.since(first - 1)],
+            ['post_created', 'post_deleted']
+        )
+
+
+class NotificationConsumerTest(TestCase):
+    async def test_coalesced_events_reach_connected_clients(self):
+        events = EventBroadcaster(window=0.05)
+        communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), '/ws/notifications/')
+        await communicator.connect()
+        # A sync view under ASGI publishes from a sync_to_async thread.
+        await sync_to_async(events.publish)('post_created', {'id': 1, 'title': 'A'})
+        await sync_to_async(events.publish)('post_updated', {'id': 1, 'title': 'B'})
+        message = await communicator.receive_json_from(timeout=1)
+        self.assertEqual((message['event_type'], message['data']['title']), ('post_created', 'B'))
+
+        await events.apublish('post_updated', {'id': 2, 'title': 'C'})
+        message = await communicator.receive_json_from(timeout=1)
+        self.assertEqual(message['data']['id'], 2)
+        await communicator.disconnect()
+        self.assertEqual(events.stats()['coalesced'], 1)
+
+    async def test_resume_replays_missed_events(self):
+        buffer = ReplayBuffer(size=10)
+        buffer.append({'event_type': 'post_created', 'data': {'id': 1}})
+        buffer.append({'event_type': 'post_updated', 'data': {'id': 1}})
+        with mock.patch('posts.consumers.get_replay_buffer', return_value=buffer):
+            communicator = WebsocketCommunicator(
+                NotificationConsumer.as_asgi(),
+                '/ws/notifications/?resume_from=1'
+            )
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            message = await communicator.receive_json_from()
+            await communicator.disconnect()
+        self.assertEqual(message['seq'], 2)
+        self.assertEqual(message['event_type'], 'post_updated')
+
+    async def test_resume_from_evicted_gap_requires_resync(self):
+        buffer = ReplayBuffer(size=1)
+        for n in range(3):
+            buffer.append({'event_type': 'post_created', 'data': {'id': n}})
+        with mock.patch('posts.consumers.get_replay_buffer', return_value=buffer):
+            communicator = WebsocketCommunicator(
+                NotificationConsumer.as_asgi(),
+                '/ws/notifications/?resume_from=0'
+            )
+            await communicator.connect()
+            message = await communicator.receive_json_from()
+            await communicator.disconnect()
+        self.assertEqual(message['event_type'], 'resync_required')
+        self.assertEqual(message['data']['latest_seq'], 3)
+
+    @override_settings(AUTH_SERVICE_SECRET_KEY='auth-service-test-key')
+    async def test_token_subprotocol_is_accepted_and_echoed(self):
+        token = jwt.encode(
+            {'sub': 'reader@example.com', 'exp': int(time.time()) + 300},
+            'auth-service-test-key', algorithm='HS256'
+        )
+        communicator = WebsocketCommunicator(
+            TokenAuthMiddleware(URLRouter(websocket_urlpatterns)),
+            '/ws/notifications/',
+            subprotocols=['bearer', token]
+        )
+        connected, subprotocol = await communicator.connect()
+        await communicator.disconnect()
+        self.assertTrue(connected)
+        self.assertEqual(subprotocol, 'bearer')
+
+
+class NotificationStreamConsumerTest(TestCase):
+    def _communicator(self, headers=()):
+        return ApplicationCommunicator(NotificationStreamConsumer.as_asgi(), {
+            'type': 'http',
+            'method': 'GET',
+            'path': '/sse/notifications/',
+            'query_string': b'',
+            'headers': list(headers),
+        })
+
+    async def test_streams_group_events(self):
+        communicator = self._communicator()
+        await communicator.send_input({'type': 'http.request', 'body': b''})
+        start = await communicator.receive_output()
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'Content-Type', b'text/event-stream'), start['headers'])
+        retry = await communicator.receive_output()
+        self.assertTrue(retry['body'].startswith(b'retry:'))
+
+        await get_channel_layer().group_send('notifications', {
+            'type': 'notification.message',
+            'message': {'event_type': 'post_created', 'data': {'id': 1}, 'seq': 42}
+        })
+        event = await communicator.receive_output()
+        self.assertTrue(event['more_body'])
+        self.assertTrue(event['body'].startswith(b'id: 42\ndata: '))
+
+        await communicator.send_input({'type': 'http.disconnect'})
+        await communicator.wait()
+
+    async def test_resumes_from_last_event_id(self):
+        buffer = ReplayBuffer(size=10)
+        for n in range(3):
+            buffer.append({'event_type': 'post_created', 'data': {'id': n}})
+        with mock.patch('posts.sse.get_replay_buffer', return_value=buffer):
+            communicator = self._communicator(headers=[(b'last-event-id', b'2')])
+            await communicator.send_input({'type': 'http.request', 'body': b''})
+            await communicator.receive_output()
+            await communicator.receive_output()
+            event = await communicator.receive_output()
+            await communicator.send_input({'type': 'http.disconnect'})
+            await communicator.wait()
+        self.assertTrue(event['body'].startswith(b'id: 3\n'))
@@ -0,0 +1,58 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def _cache():
+    return caches[getattr(settings, 'VERSION_CACHE', 'default')]
+
+
+def _key(*parts):
+    return 'version:' + ':'.join(str(part) for part in parts)
+
+
+def _now():
+    return time.time_ns() // 1000
+
+
+def get_version(*parts):
+    """
+    Return the version stamp of an object or list, e.g. get_version('post', 1).
+
+    Stamps are microsecond timestamps of the last write, so they double as a
+    Last-Modified value. An unknown stamp is initialised to "now", which is
+    always safe: clients holding older validators simply get a full response.
+    """
+    cache = _cache()
+    key = _key(*parts)
+    version = cache.get(key)
+    if version is None:
+        version = _now()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_version(*parts):
+    cache = _cache()
+    key = _key(*parts)
+    version = max(_now(), (cache.get(key) or 0) + 1)
+    cache.set(key, version, timeout=None)
+    return version
+
+
+def bump_versions(kind, ids):
+    """Bump the stamps of many objects of one kind in two cache round trips."""
+    cache = _cache()
+    keys = [_key(kind, object_id) for object_id in ids]
+    current = cache.get_many(keys)
+    now = _now()
+    cache.set_many(
+        {key: max(now, current.get(key, 0) + 1) for key in keys},
+        timeout=None
+    )
+
+
+def version_timestamp(version):
+    return version / 1_000_000
@@ -1,43 +1,209 @@
-from rest_framework import viewsets
+from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from django.conf import settings
 from django.db import transaction
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
-import json
+from django.http import Http404
 
+from content_platform.fieldsets import SparseFieldsetViewMixin
+from content_platform.tracing import start_span
+
+from .archive import archived_posts
+from .broadcast import broadcaster
+from .cache import CachedRetrieveMixin
+from .conditional import ConditionalGetMixin
+from .export import POST_EXPORT_FIELDS, post_rows, streaming_export_response
 from .models import Post
-from .serializers import PostSerializer
+from .search import search_posts
+from .serializers import PostSerializer, chunked
+from .versioning import bump_version, bump_versions
+
+def is_post_id(value):
+    # bool is an int subclass, but `true` is not an id.
+    return isinstance(value, int) and not isinstance(value, bool)
 
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(ConditionalGetMixin, CachedRetrieveMixin, SparseFieldsetViewMixin,
+                  viewsets.ModelViewSet):
     queryset = Post.objects.all()
     serializer_class = PostSerializer
+    version_kind = 'post'
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            # Archived posts stay readable by id; writes only see hot posts.
+            if self.action != 'retrieve':
+                raise
+            pk = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+            post = archived_posts().filter(pk=pk).first()
+            if post is None:
+                raise
+            return post
 
     def perform_create(self, serializer):
-        with transaction.atomic():
+        with start_span('db.transaction'), transaction.atomic():
             post = serializer.save()
             self._notify_websocket('post_created', post)
 
     def perform_update(self, serializer):
-        with transaction.atomic():
+        with start_span('db.transaction'), transaction.atomic():
             post = serializer.save()
             self._notify_websocket('post_updated', post)
 
     def perform_destroy(self, instance):
         post_id = instance.id
-        with transaction.atomic():
+        with start_span('db.transaction'), transaction.atomic():
             instance.delete()
             self._notify_websocket('post_deleted', {'id': post_id})
 
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {'error': 'Query parameter q is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            page_size = max(1, min(int(request.query_params.get('page_size', 20)), 100))
+        except ValueError:
+            page_size = 20
+
+        try:
+            rows, next_cursor = search_posts(
+                query,
+                cursor=request.query_params.get('cursor'),
+                limit=page_size
+            )
+        except NotImplementedError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+        posts = Post.objects.in_bulk([row[0] for row in rows])
+        results = []
+        for post_id, score, snippet in rows:
+            if post_id not in posts:
+                continue
+            data = self.get_serializer(posts[post_id]).data
+            data['snippet'] = snippet
+            data['score'] = score
+            results.append(data)
+
+        next_url = None
+        if next_cursor:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), 'cursor', next_cursor
+            )
+        return Response({'next': next_url, 'results': results})
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        output = request.query_params.get('output', 'ndjson')
+        if output not in ('ndjson', 'csv'):
+            return Response(
+                {'error': 'output must be ndjson or csv'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return streaming_export_response(
+            request,
+            post_rows(),
+            POST_EXPORT_FIELDS,
+            'posts',
+            output=output,
+            compress=request.query_params.get('compress') == 'gzip'
+        )
+
+    @action(detail=False, methods=['post', 'put', 'patch', 'delete'], url_path='bulk')
+    def bulk(self, request):
+        items = request.data
+        if request.method == 'DELETE':
+            items = items.get('ids') if isinstance(items, dict) else items
+        if not isinstance(items, list):
+            return Response(
+                {'error': 'Expected a list of items'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if request.method == 'POST':
+            return self._bulk_create(items)
+        if request.method == 'DELETE':
+            return self._bulk_destroy(items)
+        return self._bulk_update(items, partial=request.method == 'PATCH')
+
+    def _bulk_create(self, items):
+        serializer = self.get_serializer(data=items, many=True)
+        if not serializer.is_valid():
+            return self._bulk_errors(serializer.errors)
+        posts = serializer.save()
+        ids = [post.id for post in posts]
+        self._notify_websocket('posts_bulk_created', {'ids': ids})
+        bump_version('post', 'list')
+        return Response({'created': len(ids), 'ids': ids}, status=status.HTTP_201_CREATED)
+
+    def _bulk_update(self, items, partial):
+        errors = [{} for _ in items]
+        ids = []
+        seen = set()
+        for index, item in enumerate(items):
+            post_id = item.get('id') if isinstance(item, dict) else None
+            if not is_post_id(post_id):
+                errors[index] = {'id': ['This field is required.']}
+                post_id = None
+            elif post_id in seen:
+                # Both items would update the same row; the last would win.
+                errors[index] = {'id': ['Duplicate id.']}
+            seen.add(post_id)
+            ids.append(post_id)
+        posts = Post.objects.in_bulk([post_id for post_id in ids if post_id is not None])
+        for index, post_id in enumerate(ids):
+            if post_id is not None and post_id not in posts and not errors[index]:
+                errors[index] = {'id': ['Post not found.']}
+        if any(errors):
+            return self._bulk_errors(errors)
+
+        serializer = self.get_serializer(
+            [posts[post_id] for post_id in ids], data=items, many=True, partial=partial
+        )
+        if not serializer.is_valid():
+            return self._bulk_errors(serializer.errors)
+        serializer.save()
+        self._notify_websocket('posts_bulk_updated', {'ids': ids})
+        bump_versions('post', ids)
+        bump_version('post', 'list')
+        return Response({'updated': len(ids), 'ids': ids})
+
+    def _bulk_destroy(self, ids):
+        if not all(is_post_id(post_id) for post_id in ids):
+            return Response(
+                {'error': 'Expected a list of post ids'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        ids = list(dict.fromkeys(ids))
+        chunk_size = getattr(settings, 'BULK_CHUNK_SIZE', 1000)
+        found = []
+        for chunk in chunked(ids, chunk_size):
+            with transaction.atomic():
+                chunk_found = list(Post.objects.filter(id__in=chunk).values_list('id', flat=True))
+                Post.objects.filter(id__in=chunk_found).delete()
+                found.extend(chunk_found)
+        found_ids = set(found)
+        self._notify_websocket('posts_bulk_deleted', {'ids': found})
+        return Response({
+            'deleted': len(found),
+            'not_found': [post_id for post_id in ids if post_id not in found_ids],
+        })
+
+    def _bulk_errors(self, errors):
+        return Response(
+            {'errors': [
+                {'index': index, 'errors': item_errors}
+                for index, item_errors in enumerate(errors) if item_errors
+            ]},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
     def _notify_websocket(self, event_type, data):
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            'notifications',
-            {
-                'type': 'notification.message',
-                'message': {
-                    'event_type': event_type,
-                    'data': PostSerializer(data).data if hasattr(data, 'id') else data
-                }
-            }
-        ) 
\ No newline at end of file
+        if hasattr(data, 'id'):
+            with start_span('serialize', serializer='PostSerializer'):
+                data = PostSerializer(data).data
+        broadcaster.publish(event_type, data) 
\ No newline at end of file
@@ -0,0 +1,2 @@
+-- The auth service uses POSTGRES_DB (auth_db); the Django app gets its own database.
+CREATE DATABASE content_platform;